@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           aggregate_state.py
+coded by:           Flyingfoxi
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+import aggregation
+import memo
+
+__all__ = ["STATE_ENV", "STATE_VERSION", "REDUCERS", "GroupState", "enabled", "path", "state"]
+
+STATE_ENV = "METEO_AGGREGATE_STATE"   # set to 1 to keep the states next to the compiled data, off by default
+STATE_VERSION = 2
+REDUCERS = ("mean", "min", "max", "sum", "count")  # the reducers that follow from count, sum, min and max
+
+# the state of a column of data/JUL2.csv is stored as
+#   data/aggregates/JUL2/<column>.<grouping>.npz     keys, count, sum, min and max of every group, the number of rows
+#                                                    folded in, the first date of the series, a digest of those rows
+#                                                    and the stamp (see memo.stamp) of the file they were read from
+
+
+class GroupState:
+    """
+    running count, sum, min and max per group (see aggregation.GROUPINGS) of one value column, rows appended to the
+    series are folded in without going over the earlier ones again
+    """
+
+    def __init__(self, by: str):
+        assert by in aggregation.GROUPINGS, f"'{by}' is not a valid grouping, use one of {aggregation.GROUPINGS}"
+        self.by = by
+        self.start = None
+        self.rows = 0
+        self.stamp = None
+        self.digest = self._digest(np.zeros(0, dtype="datetime64[D]"), np.zeros(0))
+        self.keys = np.zeros((len(aggregation.group_keys(np.zeros(0, dtype="datetime64[D]"), by)), 0), dtype=np.int64)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.sum = np.zeros(0)
+        self.min = np.zeros(0)
+        self.max = np.zeros(0)
+
+    @staticmethod
+    def _digest(dates: np.ndarray, values: np.ndarray) -> str:
+        return hashlib.sha1(np.ascontiguousarray(dates, dtype="datetime64[D]").tobytes()
+                            + np.ascontiguousarray(values, dtype=np.float64).tobytes()).hexdigest()
+
+    def matches(self, dates: np.ndarray, values: np.ndarray) -> bool:
+        """True if the rows folded in so far are still the first rows of the series"""
+        return self.rows <= len(dates) and self._digest(dates[:self.rows], values[:self.rows]) == self.digest
+
+    def fold(self, dates: np.ndarray, values: np.ndarray) -> None:
+        """folds rows following the ones already in the state in, the work grows with the new rows only"""
+        if not len(dates):
+            return
+        if self.start is None:
+            self.start = np.datetime64(dates.min(), "D")
+
+        groups, count, sums, mins, maxs = aggregation.partials(np.asarray(values, dtype=np.float64),
+                                                               aggregation.group_keys(dates, self.by, self.start))
+        new_keys = np.stack(groups).astype(np.int64) if len(count) else self.keys[:, :0]
+
+        # groups of the new rows that already exist (typically only the last week / month) are combined with them
+        keys, inverse = np.unique(np.concatenate((self.keys, new_keys), axis=1), axis=1, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        size = keys.shape[1]
+
+        self.count = np.bincount(inverse, weights=np.concatenate((self.count, count)), minlength=size).astype(np.int64)
+        self.sum = np.bincount(inverse, weights=np.concatenate((self.sum, sums)), minlength=size)
+        merged_min, merged_max = np.full(size, np.inf), np.full(size, -np.inf)
+        np.minimum.at(merged_min, inverse, np.concatenate((self.min, mins)))
+        np.maximum.at(merged_max, inverse, np.concatenate((self.max, maxs)))
+        self.min, self.max, self.keys = merged_min, merged_max, keys
+
+    def update(self, dates: np.ndarray, values: np.ndarray) -> bool:
+        """
+        folds the rows of the series after the ones already in the state in, returns False if nothing was new
+        the state has to match the series (see matches)
+        """
+        if len(dates) == self.rows:
+            return False
+        self.fold(dates[self.rows:], values[self.rows:])
+        self.rows = len(dates)
+        self.digest = self._digest(dates, values)
+        return True
+
+    def result(self, how: str = "mean") -> tuple[list[np.ndarray], np.ndarray]:
+        """key columns (sorted) and reduced value of every group, like aggregation.reduce_groups"""
+        match how:
+            case "mean":
+                values = self.sum / self.count
+            case "sum":
+                values = self.sum.copy()
+            case "count":
+                values = self.count.astype(float)
+            case "min":
+                values = self.min.copy()
+            case "max":
+                values = self.max.copy()
+            case other:
+                raise ValueError(f"'{other}' can't be computed from a GroupState, use one of {REDUCERS}")
+        return list(self.keys), values
+
+    def save(self, file: str) -> None:
+        """written to a temporary file first, so concurrent readers never see half a state"""
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        temporary = f"{file}.{os.getpid()}.npz"
+        np.savez(temporary, version=STATE_VERSION, by=self.by, rows=self.rows, digest=self.digest,
+                 stamp=np.array(self.stamp if self.stamp is not None else (-1, -1), dtype=np.int64),
+                 start=np.datetime64("NaT", "D") if self.start is None else self.start,
+                 keys=self.keys, count=self.count, sum=self.sum, min=self.min, max=self.max)
+        os.replace(temporary, file)
+
+    @classmethod
+    def load(cls, file: str, by: str) -> "GroupState | None":
+        """the state saved to file, None if there is none or it was written by another version / for another grouping"""
+        try:
+            with np.load(file) as saved:
+                if int(saved["version"]) != STATE_VERSION or str(saved["by"]) != by:
+                    return None
+                loaded = cls(by)
+                loaded.rows = int(saved["rows"])
+                loaded.digest = str(saved["digest"])
+                loaded.stamp = tuple(int(v) for v in saved["stamp"]) if saved["stamp"][0] >= 0 else None
+                loaded.start = None if np.isnat(saved["start"]) else saved["start"][()]
+                loaded.keys, loaded.count = saved["keys"], saved["count"]
+                loaded.sum, loaded.min, loaded.max = saved["sum"], saved["min"], saved["max"]
+        except (FileNotFoundError, ValueError, KeyError, OSError):
+            return None
+        return loaded
+
+
+def enabled() -> bool:
+    return os.environ.get(STATE_ENV, "") not in ("", "0")
+
+
+def path(file: str, column: str, by: str) -> str:
+    return os.path.join(os.path.dirname(file), "aggregates", os.path.basename(file).split(".")[0], f"{column}.{by}.npz")
+
+
+def state(file: str, dates: np.ndarray, values: np.ndarray, column: str, by: str) -> GroupState:
+    """
+    the up to date state of a column of the compiled file, a state saved for the current stamp of the file is used as
+    it is, otherwise the rows appended since are folded in (it is rebuilt if the rows it was built from changed) and
+    it is saved again, where the data can't be written it is used without being kept
+    """
+    target = path(file, column, by)
+    stamp = memo.stamp(file)
+    current = GroupState.load(target, by)
+    if current is not None and current.stamp == stamp and current.rows == len(dates):
+        return current
+
+    if current is None or not current.matches(dates, values) or (
+            current.start is not None and len(dates) > current.rows and dates[current.rows:].min() < current.start):
+        current = GroupState(by)  # week numbers are counted from the first day, rows before it need a new state
+    current.update(dates, values)
+    current.stamp = stamp
+    try:
+        current.save(target)
+    except OSError:
+        ...
+    return current
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           aggregation.py
+coded by:           Flyingfoxi
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+__all__ = ["GROUPINGS", "REDUCERS", "years", "months", "monthdays", "weekdays", "week_numbers", "iso_weeks", "seasons",
+           "group_keys", "reduce_groups", "partials", "aggregate"]
+
+GROUPINGS = ("day", "week", "weekday", "isoweek", "month", "season", "year")
+REDUCERS = ("mean", "min", "max", "sum", "median", "count")
+
+
+def _days(dates: np.ndarray) -> np.ndarray:
+    return dates.astype("datetime64[D]").astype(np.int64)
+
+
+def _year_starts(dates: np.ndarray) -> np.ndarray:
+    return dates.astype("datetime64[Y]").astype("datetime64[D]").astype(np.int64)
+
+
+def years(dates: np.ndarray) -> np.ndarray:
+    return dates.astype("datetime64[Y]").astype(np.int64) + 1970
+
+
+def months(dates: np.ndarray) -> np.ndarray:
+    return dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+
+
+def monthdays(dates: np.ndarray) -> np.ndarray:
+    return (dates.astype("datetime64[D]") - dates.astype("datetime64[M]")).astype(np.int64) + 1
+
+
+def weekdays(dates: np.ndarray) -> np.ndarray:
+    """monday = 0 ... sunday = 6, like datetime.weekday()"""
+    return (_days(dates) + 3) % 7  # 1970-01-01 was a thursday
+
+
+def week_numbers(dates: np.ndarray, start: np.datetime64 | None = None) -> np.ndarray:
+    """
+    week of the year as used by the weekly graphs: a new week starts every monday and the count restarts
+    on the 1st of january, where the days before the first monday form week 1 (unless the year starts on a monday)
+    the first year is counted from the start of the series, start pins it when dates are only a part of the series
+    """
+    days = _days(dates)
+    if not len(days):
+        return days
+
+    jan_first = _year_starts(dates)
+    counting_start = np.maximum(jan_first, days.min() if start is None else _days(np.asarray(start)))
+
+    # mondays in [counting_start, day], (x + 3) // 7 increases by one on every monday
+    mondays = (days + 3) // 7 - (counting_start + 2) // 7
+    partial_first_week = (counting_start == jan_first) & ((jan_first + 3) % 7 != 0)
+    return mondays + partial_first_week
+
+
+def iso_weeks(dates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """iso year and iso week number, the week belongs to the year of its thursday"""
+    days = _days(dates)
+    thursdays = days - weekdays(dates) + 3
+    thursdays = thursdays.astype("datetime64[D]")
+    return years(thursdays), (_days(thursdays) - _year_starts(thursdays)) // 7 + 1
+
+
+def seasons(dates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    meteorological seasons: 0 = winter (dec - feb), 1 = spring, 2 = summer, 3 = autumn
+    december is counted to the winter of the following year
+    """
+    month = months(dates)
+    return years(dates) + (month == 12), month % 12 // 3
+
+
+def group_keys(dates: np.ndarray, by: str, start: np.datetime64 | None = None) -> List[np.ndarray]:
+    """key columns of a grouping, weekday is the week (see week_numbers) and the day of the week"""
+    match by:
+        case "day":
+            return [years(dates), months(dates), monthdays(dates)]
+        case "week":
+            return [years(dates), week_numbers(dates, start)]
+        case "weekday":
+            return [years(dates), week_numbers(dates, start), weekdays(dates)]
+        case "isoweek":
+            return list(iso_weeks(dates))
+        case "month":
+            return [years(dates), months(dates)]
+        case "season":
+            return list(seasons(dates))
+        case "year":
+            return [years(dates)]
+        case other:
+            raise ValueError(f"'{other}' is not a valid grouping, use one of {GROUPINGS}")
+
+
+def _group(values: np.ndarray, keys: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    the values without NaN, the sorted key columns of every group, the group of every value and the size and the
+    first index of every group in the values sorted by group
+    """
+    valid = ~np.isnan(values)
+    values = values[valid]
+    stacked = np.stack([np.asarray(key)[valid] for key in keys])
+
+    groups, inverse = np.unique(stacked, axis=1, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    counts = np.bincount(inverse, minlength=groups.shape[1])
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return values, groups, inverse, counts, starts
+
+
+def reduce_groups(values: np.ndarray, keys: List[np.ndarray], how: str = "mean") -> Tuple[List[np.ndarray], np.ndarray]:
+    """
+    groups values by the combined keys and reduces every group in one pass, missing values (NaN) are ignored
+    returns the key columns of every group (sorted) and the reduced value of the group
+    """
+    values, groups, inverse, counts, starts = _group(values, keys)
+
+    match how:
+        case "mean":
+            result = np.bincount(inverse, weights=values, minlength=len(counts)) / counts
+        case "sum":
+            result = np.bincount(inverse, weights=values, minlength=len(counts))
+        case "count":
+            result = counts.astype(float)
+        case "min" | "max":
+            ordered = values[np.argsort(inverse, kind="stable")]
+            ufunc = np.minimum if how == "min" else np.maximum
+            result = ufunc.reduceat(ordered, starts) if len(ordered) else ordered
+        case "median":
+            ordered = values[np.lexsort((values, inverse))]
+            result = (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2
+        case other:
+            raise ValueError(f"'{other}' is not a valid reducer, use one of {REDUCERS}")
+
+    return list(groups), result
+
+
+def partials(values: np.ndarray, keys: List[np.ndarray]) -> Tuple[List[np.ndarray], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    count, sum, min and max of every group in one pass, missing values (NaN) are ignored
+    mean, sum, min, max and count of reduce_groups follow from them, so they can be merged with those of other rows
+    """
+    values, groups, inverse, counts, starts = _group(values, keys)
+    sums = np.bincount(inverse, weights=values, minlength=len(counts))
+    if len(values):
+        ordered = values[np.argsort(inverse, kind="stable")]
+        mins, maxs = np.minimum.reduceat(ordered, starts), np.maximum.reduceat(ordered, starts)
+    else:
+        mins = maxs = values
+    return list(groups), counts, sums, mins, maxs
+
+
+def aggregate(dates: np.ndarray, values: np.ndarray, by: str = "day", how: str = "mean") -> Tuple[List[np.ndarray], np.ndarray]:
+    """groups a datetime64 series by day, week, isoweek, month, season or year and reduces every group"""
+    return reduce_groups(values, group_keys(dates, by), how)
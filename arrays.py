@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           arrays.py
+coded by:           Flyingfoxi
+"""
+
+import copy
+import functools
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List
+
+import numpy as np
+
+import aggregate_state
+import aggregation
+import columnar
+import cube
+import instrument
+import memo
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel as Array  # the class itself is built by _arrayClass on first use
+
+__all__ = ["Array", "CompactArray", "StationTable", "loadTable", "loadCSV", "getArray", "getStationsArray", "cacheInfo",
+           "invalidateCache"]
+
+# the data side of main: loading the compiled files and aggregating them into arrays, without matplotlib
+# pydantic is imported when the first Array is built, so workers that only use CompactArray never load it
+
+month_length = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+
+@functools.cache
+def _arrayClass() -> type:
+    from pydantic import BaseModel
+
+    class Array(BaseModel):
+        typ: str
+        name: str
+        data: Dict[int, Dict[int, Dict[int, float]]] | Dict[int, Dict[str, List[float]]]  # day-based / point-based
+        columns: List[str]
+        reducer: str = "mean"
+        colormap: str = "Blues"
+        plot_typ: str = "stacked"
+        display_typ: str
+
+    Array.__module__, Array.__qualname__ = __name__, "Array"  # pickled as arrays.Array
+    return Array
+
+
+def __getattr__(name: str):
+    if name == "Array":
+        return _arrayClass()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class CompactArray:
+    """
+    numpy backed alternative to Array without per-element validation
+    day / week / month arrays hold a dense years x outer key x inner key matrix (NaN where Array has no entry),
+    point arrays hold flat x / y columns and the year of every point
+    """
+
+    __slots__ = ("typ", "name", "columns", "reducer", "colormap", "plot_typ", "display_typ",
+                 "years", "outer", "inner", "values", "x", "y")
+
+    def __init__(self, typ: str, name: str, columns: List[str], display_typ: str, reducer: str = "mean",
+                 years: np.ndarray = None, outer: np.ndarray = None, inner: np.ndarray = None, values: np.ndarray = None,
+                 x: np.ndarray = None, y: np.ndarray = None):
+        self.typ = typ
+        self.name = name
+        self.columns = columns
+        self.reducer = reducer
+        self.colormap = "Blues"
+        self.plot_typ = "stacked"
+        self.display_typ = display_typ
+
+        self.years = years
+        self.outer = outer
+        self.inner = inner
+        self.values = values
+        self.x = x
+        self.y = y
+
+    @classmethod
+    def fromColumns(cls, years: np.ndarray, outer: np.ndarray, inner: np.ndarray, values: np.ndarray, **kwargs) -> "CompactArray":
+        valid = ~np.isnan(values)
+        years, outer, inner, values = years[valid], outer[valid], inner[valid], values[valid]
+
+        year_keys, outer_keys, inner_keys = np.unique(years), np.unique(outer), np.unique(inner)
+        matrix = np.full((len(year_keys), len(outer_keys), len(inner_keys)), np.nan)
+        matrix[np.searchsorted(year_keys, years), np.searchsorted(outer_keys, outer), np.searchsorted(inner_keys, inner)] = values
+        return cls(years=year_keys, outer=outer_keys, inner=inner_keys, values=matrix, **kwargs)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, field).nbytes for field in ("years", "outer", "inner", "values", "x", "y")
+                   if getattr(self, field) is not None)
+
+    @property
+    def data(self) -> dict:
+        """nested dict view in the layout of Array.data, built on every access"""
+        if self.typ == "points":
+            array_data = {}
+            for year in np.unique(self.years).tolist():
+                selected = self.years == year
+                array_data[year] = {"x_map": self.x[selected].tolist(), "y_map": self.y[selected].tolist()}
+            return array_data
+
+        yi, oi, ii = np.nonzero(~np.isnan(self.values))
+        return _nestedData(self.years[yi], self.outer[oi], self.inner[ii], self.values[yi, oi, ii])
+
+
+class StationTable:
+    """
+    columnar view of one compiled station file, one datetime64 column plus one float column per measurement
+    missing or unparsable values are stored as NaN
+    """
+
+    def __init__(self, name: str, dates: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.name = name
+        self.dates = dates
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.dates)
+
+    def column(self, column: str) -> np.ndarray:
+        try:
+            return self.columns[column]
+        except KeyError as ex:
+            raise ValueError(f"Can't find {column} in header: {['measure_date'] + list(self.columns)}") from ex
+
+
+# loaded tables and built arrays, keyed by file, its stamp and the arguments, see memo
+_cache = memo.LRUCache("main")
+
+
+def loadTable(file: str) -> StationTable:
+    """
+    reads a station file once, later calls are served from memory until the file changes on disk
+    the memory mapped columnar copy written by compile_csv is used when it is up to date, the csv otherwise
+    """
+    return _cache.get((file, memo.stamp(file), "table"), lambda: _readTable(file), _tableSize)
+
+
+def _readTable(file: str) -> StationTable:
+    name = file.split("/")[-1].split(".")[0]
+    with instrument.stage("load", station=name) as stage:
+        loaded = columnar.read(file)
+        dates, columns = loaded if loaded is not None else columnar.parse_csv(file)
+        stage.rows = len(dates)
+    return StationTable(name, dates, columns)
+
+
+def _tableSize(table: StationTable) -> int:
+    return table.dates.nbytes + sum(column.nbytes for column in table.columns.values())
+
+
+def _arraySize(array_data: "Array | CompactArray") -> int:
+    """bytes of a CompactArray, estimated for an Array (about 100 bytes per value in the nested dicts)"""
+    if isinstance(array_data, CompactArray):
+        return array_data.nbytes
+    if array_data.typ == "points":
+        return sum(200 * len(year["x_map"]) for year in array_data.data.values())
+    return sum(100 * len(inner) for outer in array_data.data.values() for inner in outer.values())
+
+
+def cacheInfo() -> dict:
+    """hits, misses, evictions, entries and bytes of the cache of loadTable and getArray"""
+    return _cache.stats()
+
+
+def invalidateCache(path: str | None = None) -> int:
+    """
+    drops the cached tables and arrays of the file or directory path (everything with None), compile_csv calls it
+    for the files it rewrites, returns the number of dropped entries
+    """
+    return memo.invalidate(path)
+
+
+def loadCSV(file, column):
+    table = loadTable(file)
+    dates = [datetime(d.year, d.month, d.day) for d in table.dates.tolist()]
+    data = table.column(column).tolist()
+    return dates, data
+
+
+def _nestedData(years: np.ndarray, outer: np.ndarray, inner: np.ndarray, values: np.ndarray) -> dict:
+    """turns flat (year, outer key, inner key, value) columns into the year -> outer -> inner dicts of Array.data"""
+    array_data = {}
+    for year, o, i, value in zip(years.tolist(), outer.tolist(), inner.tolist(), values.tolist()):
+        if value == value:  # skips NaN
+            array_data.setdefault(year, {}).setdefault(o, {})[i] = value
+    return array_data
+
+
+def _reduceColumn(file: str, table: StationTable, column: str, by: str, how: str) -> tuple[list[np.ndarray], np.ndarray]:
+    """
+    groups of a column reduced by how, computed from the rows, or read from the aggregate state kept next to the
+    compiled file if that is turned on (see aggregate_state.STATE_ENV) and how follows from count, sum, min and max
+    """
+    if how in aggregate_state.REDUCERS and aggregate_state.enabled():
+        return aggregate_state.state(file, table.dates, table.column(column), column, by).result(how)
+    return aggregation.reduce_groups(table.column(column), aggregation.group_keys(table.dates, by), how)
+
+
+def _getWeekBasedArray(file, column, weekly_average=True, how="mean", compact=False) -> "Array | CompactArray":
+    table = loadTable(file)
+
+    if weekly_average:
+        # the value of a week is drawn on its thursday
+        (years, weeks), values = _reduceColumn(file, table, column, "week", how)
+        slots = np.full(len(values), 3)
+    else:
+        (years, weeks, slots), values = _reduceColumn(file, table, column, "weekday", how)
+
+    info = dict(typ="week",
+                name=file.split("/")[-1].split(".")[0],
+                columns=["measure_date", column],
+                reducer=how,
+                display_typ="Woche")
+
+    if compact:
+        return CompactArray.fromColumns(years, weeks, slots, values, **info)
+    return _arrayClass()(data=_nestedData(years, weeks, slots, values), **info)
+
+
+def _getDayBasedArray(file, column, month_average=False, how="mean", compact=False) -> "Array | CompactArray":
+    table = loadTable(file)
+
+    if month_average:
+        # the value of a month is drawn in its middle
+        (years, months), values = _reduceColumn(file, table, column, "month", how)
+        days = np.array(month_length)[months - 1] // 2
+    else:
+        (years, months, days), values = _reduceColumn(file, table, column, "day", how)
+
+    info = dict(typ=("month" if month_average else "day"),
+                name=file.split("/")[-1].split(".")[0],
+                columns=["measure_date", column],
+                reducer=how,
+                display_typ=("monat" if month_average else "tag").capitalize())
+
+    if compact:
+        return CompactArray.fromColumns(years, months, days, values, **info)
+    return _arrayClass()(data=_nestedData(years, months, days, values), **info)
+
+
+def _getPointBasedArray(file: str, key, value, compact=False) -> "Array | CompactArray":
+    assert ("measure_date" not in (key, value)), "key or value can't be measure_date, use getArray"
+
+    table = loadTable(file)
+    k_data = table.column(key)
+    v_data = table.column(value)
+    valid = ~(np.isnan(k_data) | np.isnan(v_data))
+
+    info = dict(typ="points",
+                name=file.split("/")[-1].split(".")[0],
+                columns=[key, value],
+                display_typ="Tag")
+
+    if compact:
+        return CompactArray(years=aggregation.years(table.dates)[valid], x=k_data[valid], y=v_data[valid], **info)
+
+    array_data = {}
+
+    for i, day in enumerate(table.dates.tolist()):
+        if day.year not in array_data:
+            array_data[day.year] = {"x_map": list(), "y_map": list()}
+
+        if valid[i]:
+            array_data[day.year]["y_map"].append(float(v_data[i]))
+            array_data[day.year]["x_map"].append(float(k_data[i]))
+
+    return _arrayClass()(data=array_data, **info)
+
+
+def getStationsArray(value: str, key: str = "TA_30MIN_MEAN", dir_: str = "data/", stations: List[str] | None = None,
+                     compact: bool = False) -> "Array | CompactArray":
+    """
+    points of value over key of every station in dir_ (or of stations) in one array, taken from the station cube
+    (see cube.load) at once instead of one getArray per station file
+    """
+    station_cube = cube.load(dir_)
+    _, days, x, y = station_cube.points(key, value, stations)
+    info = dict(typ="points",
+                name=", ".join(stations or station_cube.stations),
+                columns=[key, value],
+                display_typ="Tag")
+
+    points = CompactArray(years=aggregation.years(days), x=x, y=y, **info)
+    return points if compact else _arrayClass()(data=points.data, **info)
+
+
+def getArray(file: str, value: str, key: str = "measure_date", typ: str = "day", how: str = "mean",
+             compact: bool = False) -> "Array | CompactArray":
+    """
+    how reduces all measurements of a day / week / month to one value, see aggregation.REDUCERS
+    compact returns a numpy backed CompactArray instead of the pydantic Array
+    the arrays are cached until the file changes (see cacheInfo), every call gets its own copy of the array object
+    but the data is shared, so it must not be changed in place
+    """
+    array_data = _cache.get((file, memo.stamp(file), "array", value, key, typ, how, compact),
+                            lambda: _buildArray(file, value, key, typ, how, compact), _arraySize)
+    return copy.copy(array_data) if isinstance(array_data, CompactArray) else array_data.copy()
+
+
+def _buildArray(file: str, value: str, key: str, typ: str, how: str, compact: bool) -> "Array | CompactArray":
+    with instrument.stage("aggregate", station=file.split("/")[-1].split(".")[0], field=value,
+                          typ="points" if key != "measure_date" else typ):
+        if key != "measure_date":
+            return _getPointBasedArray(file, key=key, value=value, compact=compact)
+
+        if typ == "week":
+            return _getWeekBasedArray(file, value, how=how, compact=compact)
+        else:
+            return _getDayBasedArray(file, value, bool(typ == "month"), how=how, compact=compact)
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           benchmark.py
+coded by:           Flyingfoxi
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+import numpy as np
+
+__all__ = ["STATION_HEADER", "RAINFALL_HEADER", "station_names", "generate_station", "generate_rainfall", "generate",
+           "measure", "import_time", "run", "compare"]
+
+STATION_HEADER = ["station_code", "measure_date", "hyear", "HS", "TA_30MIN_MEAN", "DW_30MIN_MEAN", "VW_30MIN_MEAN"]
+RAINFALL_HEADER = ["stn", "time", "rre024i0"]
+LAST_YEAR = 2023
+STAGES = ("extract", "trend", "rainfall", "fuse", "columnar", "load", "week_array", "day_array", "month_array",
+          "point_array", "plot_stacked", "plot_linear", "plot_points")
+IMPORTS = ("arrays", "main", "plotting")  # the headless data api, the render pipeline and the plotting stack
+
+# a benchmark directory (default benchmarks/<years>y_<stations>st/) holds
+#   raw/<station>.csv, raw/niederschlag.csv    synthetic exports, kept between runs and rebuilt if the parameters change
+#   data/                                      everything the stages write
+
+
+def station_names(count: int) -> dict[str, str | None]:
+    """station -> code in niederschlag.csv, the first three are the real stations (VAL2 has no rainfall)"""
+    names = {"JUL2": "JU2", "URS2": "UR2", "VAL2": None}
+    names.update({f"S{i:03d}": f"S{i:02d}" for i in range(4, count + 1)})
+    return dict(list(names.items())[:count])
+
+
+def _column(values: np.ndarray, missing: np.ndarray, decimals: int) -> list[str]:
+    return ["" if m else f"{v:.{decimals}f}" for v, m in zip(values.tolist(), missing.tolist())]
+
+
+def generate_station(path: str, station: str, first_year: int, last_year: int, rng: np.random.Generator,
+                     missing: float = 0.03) -> int:
+    """
+    30 minute export of one station like raw/JUL2.csv with a seasonal snow height and temperature, missing values
+    appear with the probability missing, returns the number of rows
+    """
+    rows = 0
+    with open(path, "w") as f:
+        f.write(",".join(STATION_HEADER) + "\n")
+        for year in range(first_year, last_year + 1):
+            times = np.arange(np.datetime64(f"{year}-01-01T00:00"), np.datetime64(f"{year + 1}-01-01T00:00"), np.timedelta64(30, "m"))
+            n = len(times)
+            season = np.cos(np.arange(n) / n * 2 * np.pi)
+
+            hs = np.clip(60 + 90 * season + rng.normal(0, 5, n), 0, None)
+            ta = 5 - 10 * season + rng.normal(0, 3, n)
+            dw = rng.uniform(0, 360, n)
+            vw = rng.gamma(2, 1.5, n)
+            gaps = rng.random((4, n)) < missing
+
+            stamps = [s.replace("T", " ") + "+00:00" for s in np.datetime_as_string(times, unit="s").tolist()]
+            hyear = np.where(times.astype("datetime64[M]").astype(np.int64) % 12 >= 9, year + 1, year).tolist()
+            columns = zip(stamps, hyear, _column(hs, gaps[0], 1), _column(ta, gaps[1], 1), _column(dw, gaps[2], 0),
+                          _column(vw, gaps[3], 1))
+            f.write("".join([f"{station},{t},{h},{a},{b},{c},{d}\n" for t, h, a, b, c, d in columns]))
+            rows += n
+    return rows
+
+
+def generate_rainfall(path: str, codes: list[str], first_year: int, last_year: int, rng: np.random.Generator,
+                      missing: float = 0.02) -> int:
+    """
+    niederschlag.csv with a 24h sum at 06 and 12 utc for every code and a station that is not compiled,
+    returns the number of rows
+    """
+    days = np.arange(np.datetime64(f"{first_year}-01-01"), np.datetime64(f"{last_year + 1}-01-01"))
+    dates = [d.replace("-", "") for d in np.datetime_as_string(days).tolist()]
+    rows = 0
+    with open(path, "w") as f:
+        f.write(";".join(RAINFALL_HEADER) + "\n")
+        for code in codes + ["XX1"]:
+            for hour in ("06", "12"):
+                values = _column(np.floor(rng.exponential(6, len(days))), rng.random(len(days)) < missing, 0)
+                f.write("".join([f"{code};{d}{hour};{v}\n" for d, v in zip(dates, values)]))
+                rows += len(days)
+    return rows
+
+
+def generate(directory: str, years: int, stations: int, seed: int = 1) -> dict:
+    """raw/ of a benchmark directory, reused if it was generated with the same parameters"""
+    params = {"years": years, "stations": stations, "seed": seed, "last_year": LAST_YEAR}
+    marker = os.path.join(directory, "raw", "params.json")
+    try:
+        with open(marker, "r") as f:
+            if json.load(f) == params:
+                return params
+    except (FileNotFoundError, json.JSONDecodeError):
+        ...
+
+    os.makedirs(os.path.join(directory, "raw"), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    first_year = LAST_YEAR - years + 1
+    names = station_names(stations)
+    for station in names:
+        generate_station(os.path.join(directory, "raw", station + ".csv"), station, first_year, LAST_YEAR, rng)
+    generate_rainfall(os.path.join(directory, "raw", "niederschlag.csv"), [c for c in names.values() if c], first_year,
+                      LAST_YEAR, rng)
+
+    with open(marker, "w") as f:
+        json.dump(params, f)
+    return params
+
+
+def measure(function: Callable[[], object], repeat: int = 3, memory: bool = True,
+            setup: Callable[[], object] | None = None) -> dict:
+    """
+    best and all wall times of repeat calls, plus one more call under tracemalloc for the peak of the memory allocated
+    by python and numpy, rss_mb is the peak resident size of the whole process so far
+    setup is called (untimed) before every call, so no call profits from what the one before it left behind
+    """
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+    result = {"seconds": min(runs), "runs": runs}
+
+    if memory:
+        if setup:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        function()
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    result["rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def _stages(names: dict[str, str | None], first_year: int) -> dict[str, Callable[[], object]]:
+    """every stage of the pipeline over all stations, run inside the benchmark directory"""
+    import arrays
+    import compile_csv
+    import columnar
+    import plotting
+    import timestamps
+    from matplotlib import pyplot as plt
+
+    years = list(range(first_year, LAST_YEAR + 1))
+    required = ["station_code", "measure_date", "HS", "TA_30MIN_MEAN", "DW_30MIN_MEAN"]
+    rainfall = {code: station for station, code in names.items() if code}
+    files = [f"data/{station}.csv" for station in names]
+    colors = [plt.cm.viridis(i / len(years)) for i in range(len(years))]
+
+    def extract():
+        for station in names:
+            extract = compile_csv.DailyExtract(required, f"data/extract_{station}.csv", years)
+            compile_csv.scan_source(f"raw/{station}.csv", [extract], "measure_date")
+
+    def trend():
+        for station in names:
+            trend = compile_csv.WinterTrend(required[:3], compile_csv.WINTER, years, f"data/trend/{station}.csv")
+            compile_csv.scan_source(f"raw/{station}.csv", [trend], "measure_date")
+
+    def split():
+        split = compile_csv.RainfallSplit(RAINFALL_HEADER, "data/", years, rainfall)
+        compile_csv.scan_source("raw/niederschlag.csv", [split], "time", timestamps.RAINFALL_FORMAT, ";")
+
+    def fuse():
+        for station, code in names.items():
+            inputs = [f"data/extract_{station}.csv"] + ([f"data/_{station}.csv"] if code else [])
+            compile_csv.fuse_files(*inputs, output=f"data/{station}.csv", remove=False)
+
+    def convert():
+        for file in files:
+            columnar.convert(file)
+
+    def load():
+        arrays.invalidateCache()
+        for file in files:
+            arrays.loadCSV(file, "HS")
+
+    def plot(typ: str, plot_typ: str) -> Callable[[], None]:
+        prepared = [arrays.getArray(file, "HS", key="TA_30MIN_MEAN", typ="points") if typ == "points" else arrays.getArray(file, "HS", typ=typ)
+                    for file in files]
+
+        def draw():
+            for array in prepared:
+                plotting.plotArray(array, "Blues" if plot_typ != "stacked" else colors, plot_typ="linear" if plot_typ == "points" else plot_typ)
+                plt.savefig(os.path.join("data", "plot.png"))
+                plt.close("all")
+        return draw
+
+    return {"extract": extract,
+            "trend": trend,
+            "rainfall": split,
+            "fuse": fuse,
+            "columnar": convert,
+            "load": load,
+            "week_array": lambda: [arrays._getWeekBasedArray(file, "HS") for file in files],
+            "day_array": lambda: [arrays._getDayBasedArray(file, "HS") for file in files],
+            "month_array": lambda: [arrays._getDayBasedArray(file, "HS", month_average=True) for file in files],
+            "point_array": lambda: [arrays._getPointBasedArray(file, "TA_30MIN_MEAN", "HS") for file in files],
+            "plot_stacked": lambda: plot("week", "stacked"),
+            "plot_linear": lambda: plot("day", "linear"),
+            "plot_points": lambda: plot("points", "points")}
+
+
+def _clear_aggregates() -> None:
+    shutil.rmtree(os.path.join("data", "aggregates"), ignore_errors=True)
+
+
+def import_time(module: str, repeat: int = 3) -> dict:
+    """
+    cold start cost of module: best wall time of importing it in a new interpreter, and whether that import loaded
+    matplotlib and pydantic
+    """
+    code = (f"import sys, time; start = time.perf_counter(); import {module}; "
+            f"print(time.perf_counter() - start, 'matplotlib' in sys.modules, 'pydantic' in sys.modules)")
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+        runs.append(float(output[0]))
+    return {"seconds": min(runs), "runs": runs, "matplotlib": output[1] == "True", "pydantic": output[2] == "True"}
+
+
+def run(years: int, stations: int, repeat: int = 3, memory: bool = True, stages: list[str] | None = None,
+        directory: str | None = None, seed: int = 1) -> dict:
+    """generates (or reuses) the raw files of one size and measures every stage in order"""
+    directory = os.path.abspath(directory or os.path.join("benchmarks", f"{years}y_{stations}st"))
+    start = time.perf_counter()
+    generate(directory, years, stations, seed)
+    generated = time.perf_counter() - start
+
+    raw_bytes = sum(os.path.getsize(os.path.join(directory, "raw", f)) for f in os.listdir(os.path.join(directory, "raw")))
+    result = {"years": years, "stations": stations, "raw_mb": raw_bytes / 2 ** 20, "generate_seconds": generated, "stages": {}}
+
+    cwd = os.getcwd()
+    os.makedirs(os.path.join(directory, "data", "trend"), exist_ok=True)
+    os.chdir(directory)
+    try:
+        functions = _stages(station_names(stations), LAST_YEAR - years + 1)
+        for stage in STAGES:
+            if stages and stage not in stages:
+                continue
+            function = functions[stage]
+            if stage.startswith("plot_"):
+                function = function()  # the arrays are built once, only the drawing is measured
+            # the arrays of every repeat are reduced from the rows, not from the aggregate states the first one saved
+            setup = _clear_aggregates if stage.endswith("_array") else None
+            result["stages"][stage] = measure(function, repeat, memory, setup)
+            print(f"{years:>4}y x {stations} station(s)  {stage:<13} {result['stages'][stage]['seconds']:8.3f}s"
+                  + (f"  peak {result['stages'][stage]['peak_mb']:8.1f} MB" if memory else ""))
+    finally:
+        os.chdir(cwd)
+    return result
+
+
+def compare(previous: dict, current: dict) -> list[tuple[str, float, float]]:
+    """(size and stage / import, previous seconds, current seconds) of every stage and import measured in both runs"""
+    rows = []
+    for module, measured in current.get("imports", {}).items():
+        old = previous.get("imports", {}).get(module)
+        if old is not None:
+            rows.append((f"import {module}", old["seconds"], measured["seconds"]))
+    before = {(r["years"], r["stations"]): r["stages"] for r in previous["results"]}
+    for r in current["results"]:
+        for stage, measured in r["stages"].items():
+            old = before.get((r["years"], r["stations"]), {}).get(stage)
+            if old is not None:
+                rows.append((f"{r['years']}y x {r['stations']} {stage}", old["seconds"], measured["seconds"]))
+    return rows
+
+
+def _environment() -> dict:
+    import matplotlib
+    import pydantic
+    return {"python": platform.python_version(),
+            "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__,
+            "pydantic": pydantic.VERSION,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def main(args: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="times and memory profiles the compile and plot stages on synthetic data")
+    parser.add_argument("-y", "--years", type=int, nargs="+", default=[1, 10], help="years of data per size (default: 1 10)")
+    parser.add_argument("-s", "--stations", type=int, nargs="+", default=[3], help="stations per size (default: 3)")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="timed runs per stage, the best one is reported")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=None, help="only these stages")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run of every stage")
+    parser.add_argument("--no-imports", action="store_true", help="skip the import time of the modules")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="result file (default: benchmark.json)")
+    parser.add_argument("-c", "--compare", default=None, help="result file of an earlier run to compare with")
+    args = parser.parse_args(args)
+
+    import matplotlib
+    matplotlib.use("Agg")
+    logging.getLogger("matplotlib.font_manager").setLevel(logging.ERROR)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    imports = {}
+    for module in () if args.no_imports else IMPORTS:
+        imports[module] = import_time(module, args.repeat)
+        loaded = [name for name in ("matplotlib", "pydantic") if imports[module][name]]
+        print(f"import {module:<10} {imports[module]['seconds']:8.3f}s  loads {', '.join(loaded) or 'neither matplotlib nor pydantic'}")
+
+    results = [run(years, stations, args.repeat, not args.no_memory, args.stages)
+               for stations in args.stations for years in args.years]
+    report = {"environment": _environment(), "repeat": args.repeat, "imports": imports, "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            previous = json.load(f)
+        for name, old, new in compare(previous, report):
+            print(f"{name:<32} {old:8.3f}s -> {new:8.3f}s  ({new / old if old else float('inf'):5.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           calendar_index.py
+coded by:           Flyingfoxi
+"""
+
+import numpy as np
+
+__all__ = ["year_starts", "year_lengths", "from_keys", "day_offsets", "year_boundaries", "month_boundaries"]
+
+
+def year_starts(years: np.ndarray) -> np.ndarray:
+    """1st of january of every year as datetime64[D]"""
+    return (np.asarray(years, dtype=np.int64) - 1970).astype("datetime64[Y]").astype("datetime64[D]")
+
+
+def year_lengths(years: np.ndarray) -> np.ndarray:
+    return (year_starts(np.asarray(years) + 1) - year_starts(years)).astype(np.int64)
+
+
+def from_keys(years: np.ndarray, months: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """datetime64[D] of year / month / day columns, days past the end of a month roll over into the next one"""
+    months = (np.asarray(years, dtype=np.int64) - 1970) * 12 + np.asarray(months, dtype=np.int64) - 1
+    return months.astype("datetime64[M]").astype("datetime64[D]") + (np.asarray(days, dtype=np.int64) - 1)
+
+
+def day_offsets(dates: np.ndarray, origin: np.ndarray | np.datetime64) -> np.ndarray:
+    """whole days from origin to every date, origin may be a single date or one date per entry"""
+    return (dates.astype("datetime64[D]") - np.asarray(origin).astype("datetime64[D]")).astype(np.int64)
+
+
+def year_boundaries(first: int, last: int) -> np.ndarray:
+    """day offsets of the 1st of january of the years first ... last relative to the 1st of january of first"""
+    return day_offsets(year_starts(np.arange(first, last + 1)), year_starts(first))
+
+
+def month_boundaries(year: int) -> np.ndarray:
+    """day offsets of the 1st of every month of year and of the 1st of january after it relative to the 1st of january of year"""
+    months = np.arange(1, 14)
+    return day_offsets(from_keys(np.full(13, year), months, np.ones(13, dtype=np.int64)), year_starts(year))
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           columnar.py
+coded by:           Flyingfoxi
+"""
+
+import csv
+import json
+import os
+import shutil
+
+import numpy as np
+
+import instrument
+import memo
+import timestamps
+
+__all__ = ["SCHEMA_VERSION", "directory", "to_float", "parse_rows", "parse_csv", "write", "read", "convert"]
+
+SCHEMA_VERSION = 2
+
+# data/JUL2.csv is stored as
+#   data/columnar/JUL2/schema.json          rows, column dtypes and the memo.stamp of the csv it was built from
+#   data/columnar/JUL2/measure_date.npy     datetime64[D]
+#   data/columnar/JUL2/<column>.npy         float64, NaN for missing values
+
+
+def directory(file: str) -> str:
+    return os.path.join(os.path.dirname(file), "columnar", os.path.basename(file).split(".")[0])
+
+
+def to_float(values: list[str]) -> np.ndarray:
+    try:
+        return np.array([v if v else "nan" for v in values], dtype=float)
+    except ValueError:
+        array = np.full(len(values), np.nan)
+        for i, v in enumerate(values):
+            try:
+                array[i] = float(v)
+            except ValueError:
+                ...
+        return array
+
+
+def parse_rows(data: list[list[str]]) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """dates and float columns of a compiled table (header first), station_code is dropped"""
+    header = data[0]
+    content = data[1:]
+    date_index = header.index("measure_date")
+
+    dates = timestamps.days([row[date_index] for row in content])
+    columns = {column: to_float([row[i] for row in content])
+               for i, column in enumerate(header) if column not in ("station_code", "measure_date")}
+    return dates, columns
+
+
+def parse_csv(file: str) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """dates and float columns of a compiled csv file, station_code is dropped"""
+    with open(file, "r") as f:
+        return parse_rows([row for row in csv.reader(f)])
+
+
+def write(file: str, dates: np.ndarray, columns: dict[str, np.ndarray]) -> str:
+    """writes the columns next to file, the schema is written last so a half written directory is never read"""
+    target = directory(file)
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    os.makedirs(target)
+
+    np.save(os.path.join(target, "measure_date.npy"), dates.astype("datetime64[D]"))
+    for column, values in columns.items():
+        np.save(os.path.join(target, column + ".npy"), np.asarray(values, dtype=np.float64))
+
+    schema = {"version": SCHEMA_VERSION,
+              "rows": len(dates),
+              "source": list(memo.stamp(file)) if os.path.exists(file) else None,
+              "columns": {"measure_date": "datetime64[D]", **{column: "float64" for column in columns}}}
+    with open(os.path.join(target, "schema.json"), "w") as f:
+        json.dump(schema, f, indent=2)
+    return target
+
+
+def read(file: str, mmap_mode: str | None = "r") -> tuple[np.ndarray, dict[str, np.ndarray]] | None:
+    """
+    memory mapped columns of file, None if there is no columnar copy or the csv changed since it was written
+    """
+    target = directory(file)
+    try:
+        with open(os.path.join(target, "schema.json"), "r") as f:
+            schema = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if schema.get("version") != SCHEMA_VERSION:
+        return None
+    if os.path.exists(file) and schema["source"] != list(memo.stamp(file)):
+        return None
+
+    dates = np.load(os.path.join(target, "measure_date.npy"), mmap_mode=mmap_mode)
+    columns = {column: np.load(os.path.join(target, column + ".npy"), mmap_mode=mmap_mode)
+               for column in schema["columns"] if column != "measure_date"}
+    return dates, columns
+
+
+def convert(file: str, data: list[list[str]] | None = None) -> str:
+    """builds the columnar copy of a compiled csv file, from data if the rows that were just written are passed"""
+    with instrument.stage("columnar", station=os.path.basename(file).split(".")[0]) as stage:
+        dates, columns = parse_csv(file) if data is None else parse_rows(data)
+        stage.rows = len(dates)
+        return write(file, dates, columns)
@@ -5,8 +5,25 @@ filename:           compile_csv.py
 coded by:           Flyingfoxi
 """
 
-import datetime
+import argparse
+import functools
+import hashlib
+import itertools
+import json
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Iterable, NamedTuple
+
+import numpy as np
+
+import aggregation
+import columnar
+import instrument
+import memo
+import raw_reader
+import timestamps
+import trends
 
 
 def read_file(file: str, sep=",") -> tuple[list, list]:
@@ -22,134 +39,546 @@ def write_file(data: list[list[str]], file: str) -> None:
         f.write(values)
 
 
-def edit_file(name: str, required_data: list[str], time_format="%Y-%m-%d %H:%M:%S%z", seperator=",", save=True):
-    data, header = read_file(name, seperator)
+class DailyExtract:
+    """
+    12:00 rows of the years 2008 - 2023, written to output while the raw file is scanned
+    with keep_rows they are also kept in memory and returned as a table by finish, otherwise memory stays bounded
+    """
+    appendable = True
+    stage = "filter"
+
+    def __init__(self, required_data: list[str], output: str, years: Iterable[int] = range(2008, 2024),
+                 keep_rows: bool = False):
+        self.columns = list(required_data)
+        self.years = list(years)
+        self.output = output
+        self.keep_rows = keep_rows
+        self.outputs = [output]
+        self.params = {"required_data": self.columns, "years": self.years}
+        self.written = 0
+
+    def start(self, columns: list[str], append: bool) -> None:
+        self._index = [columns.index(c) for c in self.columns]
+        self._append = append
+        self._rows = []
+        self._dst = open(self.output, "a" if append else "w")
+        if not append:
+            self._dst.write(",".join(self.columns))
+
+    def feed(self, rows: list[list[str]], dates: np.ndarray) -> None:
+        keep = np.isin(aggregation.years(dates), self.years)
+        selected = [[dat[i] for i in self._index] for dat in itertools.compress(rows, keep.tolist())]
+        self._dst.write("".join(["\n" + ",".join(dat) for dat in selected]))
+        if self.keep_rows:
+            self._rows.extend(selected)
+        self.written += len(selected)
+
+    def finish(self) -> list[list[str]] | None:
+        """the extracted table, None when only new rows were appended or the rows were not kept"""
+        self._dst.close()
+        return None if self._append or not self.keep_rows else [self.columns] + self._rows
+
+
+class WinterTrend:
+    """
+    average of the last column over the months of every year (see trends.group_values), written to output once the
+    scan is done, with a state file the values of every year are kept there, so new rows of the raw file are added to
+    them instead of scanning it again
+    """
+    appendable = False
+    stage = "trend"
+
+    def __init__(self, required_data: list[str], months: list[int], years: Iterable[int], output: str, label: str = "raw",
+                 columnar_copy: bool = True, state: str | None = None):
+        self.columns = list(required_data)
+        self.months = list(months)
+        self.years = list(years)
+        self.output = output
+        self.label = label
+        self.columnar_copy = columnar_copy
+        self.state = state
+        self.appendable = state is not None
+        self.outputs = [output] + ([os.path.join(columnar.directory(output), "schema.json")] if columnar_copy else [])
+        self.outputs += [state] if state else []
+        self.params = {"required_data": self.columns, "months": self.months, "years": self.years}
+
+    def start(self, columns: list[str], append: bool) -> None:
+        assert not append or self.appendable, "the trend needs every row of the raw file without a state"
+        self._index = columns.index(self.columns[-1])
+        self._years: list[np.ndarray] = []
+        self._values: list[np.ndarray] = []
+        if append:
+            with open(self.state, "r") as f:
+                state = json.load(f)
+            self._years.append(np.array(state["years"], dtype=np.int64))
+            self._values.append(np.array(state["values"], dtype=float))
+
+    def feed(self, rows: list[list[str]], dates: np.ndarray) -> None:
+        keep = np.isin(aggregation.years(dates), self.years) & np.isin(aggregation.months(dates), self.months)
+        values = columnar.to_float([dat[self._index] for dat in itertools.compress(rows, keep.tolist())])
+        valid = ~np.isnan(values)
+        self._years.append(aggregation.years(dates[keep])[valid])
+        self._values.append(values[valid])
+
+    def finish(self) -> list[list[str]]:
+        years = np.concatenate(self._years) if self._years else np.zeros(0, dtype=np.int64)
+        values = np.concatenate(self._values) if self._values else np.zeros(0)
+        compiled = [list(self.columns)]
+        if len(values):
+            # reduced once over all rows, so an appended scan gives the same means as a full one
+            (groups,), means = trends.group_values(values[None], [years])
+            compiled += [[self.label, str(year), str(mean)] for year, mean in zip(groups.tolist(), means[0].tolist())]
+        write_file(compiled, self.output)
+        if self.columnar_copy:
+            columnar.convert(self.output, compiled)
+        if self.state:
+            # floats are written with repr, so the values are read back exactly
+            with open(self.state, "w") as f:
+                json.dump({"years": years.tolist(), "values": values.tolist()}, f)
+        return compiled
+
+
+class RainfallSplit:
+    """
+    12:00 rainfall of niederschlag.csv split into one table per station, the 24h sum measured at 12:00 is
+    dated to 00:00 of the same day
+    """
+    appendable = False
+    stage = "rainfall"
+    codes = {"JU2": "JUL2", "UR2": "URS2"}
+
+    def __init__(self, required_data: list[str], output_dir: str, years: Iterable[int] = range(2008, 2024),
+                 codes: dict[str, str] | None = None):
+        self.columns = list(required_data)
+        self.years = list(years)
+        self.output_dir = output_dir
+        self.codes = dict(codes or self.codes)
+        self.outputs = [output_dir + f"_{station}.csv" for station in self.codes.values()]
+        self.params = {"required_data": self.columns, "years": self.years, "codes": self.codes}
+
+    def start(self, columns: list[str], append: bool) -> None:
+        assert not append, "the rainfall split is rebuilt from every row"
+        self._index = [columns.index(c) for c in self.columns]
+        self._tables = {station: [["station_code", "measure_date", self.columns[2]]] for station in self.codes.values()}
+
+    def feed(self, rows: list[list[str]], dates: np.ndarray) -> None:
+        keep = np.isin(aggregation.years(dates), self.years)
+        selected = [[dat[i] for i in self._index] for dat in itertools.compress(rows, keep.tolist())]
+        times = timestamps.shift(timestamps.parse([dat[1] for dat in selected], timestamps.RAINFALL_FORMAT), -12)
+        measure_dates = timestamps.format_utc(times)
+        for (code, _, value), year, measure_date in zip(selected, aggregation.years(times).tolist(), measure_dates):
+            station_code = next((station for c, station in self.codes.items() if c in code), None)
+            if station_code is None or year == 2007:
+                continue
+            self._tables[station_code].append([station_code, measure_date, value])
+
+    def finish(self) -> dict[str, list[list[str]]]:
+        for station, table in self._tables.items():
+            write_file(table, self.output_dir + f"_{station}.csv")
+        return self._tables
+
+
+def scan_source(name: str, consumers: list, time_column: str, time_format: str = timestamps.STATION_FORMAT,
+                seperator: str = ",", start: int = 0, block_size: int = 1 << 23) -> tuple[int, list]:
+    """
+    scans the raw file once and hands the 12:00 rows of every block to all consumers, each one keeps the years and
+    columns it needs, returns the number of rows read and the result of every consumer
+    with a start offset only the lines from that byte position on are read, every consumer has to be appendable
+    """
+    assert not start or all(c.appendable for c in consumers), "only appendable consumers can continue a scan"
+    raw = raw_reader.open_raw(name, seperator)
+
+    columns = []
+    for consumer in consumers:
+        columns += [c for c in consumer.columns if c not in columns]
+    years = sorted(set().union(*(consumer.years for consumer in consumers)))
+
+    station = os.path.basename(name).split(".")[0]
+    read = instrument.span("read", station=station)
+    spans = [instrument.span(consumer.stage, station=station) for consumer in consumers]
+
+    for consumer in consumers:
+        consumer.start(columns, bool(start))
+    scanned = 0
+    blocks = raw.select(columns, time_column, time_format, years, start=start, block_size=block_size, with_dates=True)
+    while True:
+        with read:
+            block = next(blocks, None)
+        if block is None:
+            break
+        rows, dates = block
+        scanned += len(rows)
+        for consumer, span in zip(consumers, spans):
+            with span:
+                consumer.feed(rows, dates)
+
+    results = []
+    for consumer, span in zip(consumers, spans):
+        with span:
+            results.append(consumer.finish())
+        span.rows = scanned
+        span.close()
+    read.rows = scanned
+    read.close()
+    return scanned, results
+
+
+def stream_file(name: str, required_data: list[str], time_format=timestamps.STATION_FORMAT, seperator=",",
+                output: str | None = None, block_size: int = 1 << 23, offset: int = 0) -> int:
+    """
+    streaming version of edit_file, the memory mapped raw file is filtered and written block by block so memory stays
+    bounded, returns the number of rows written
+    with an offset only the lines starting at that byte position are read and appended to the existing output
+    """
+    extract = DailyExtract(required_data, output or "data/" + name.split("/")[1])
+    scan_source(name, [extract], required_data[1], time_format, seperator, start=offset, block_size=block_size)
+    return extract.written
+
+
+def edit_file(name: str, required_data: list[str], time_format=timestamps.STATION_FORMAT, seperator=",", save=True):
+    raw = raw_reader.open_raw(name, seperator)
 
     year_count = list(range(2008, 2024))
-    used_index = [header.index(i) for i in required_data]
-    new_data = [[header[i] for i in used_index]]
-
-    for dat in data:
-        try:
-            time = datetime.datetime.strptime(dat[header.index(required_data[1])], time_format)
-            if time.hour == 12 and time.minute == 0 and time.year in year_count:
-                new_data.append([dat[i] for i in used_index])
-        except ValueError:
-            ...
+    new_data = [list(required_data)]
+    for rows in raw.select(required_data, required_data[1], time_format, year_count):
+        new_data.extend(rows)
 
     if save:
         write_file(new_data, "data/" + name.split("/")[1])
     return new_data
 
 
-def collect_rainfall(file: str, required: list[str]):
-    edit_file(file, required, seperator=";", time_format="%Y%m%d%H")
-
-    data, header = read_file("data/" + file.split("/")[1])
-    new_data = {
-        "JUL2": [["station_code", "measure_date", "rre024i0"]],
-        "URS2": [["station_code", "measure_date", "rre024i0"]]
-    }
-
-    for dat in data:
-        station_code = "JUL2" if "JU2" in dat[0] else "URS2" if "UR2" in dat[0] else "N/A"
-        parsed_date = datetime.datetime.strptime(dat[1], "%Y%m%d%H")
-        parsed_date = parsed_date.replace(tzinfo=datetime.timezone.utc)
-        parsed_date -= datetime.timedelta(hours=12)
-        if parsed_date.year == 2007: continue
-        measure_date = parsed_date.strftime("%Y-%m-%d %H:%M:%S%z")
-
-        rre024i0 = dat[2]
-        match station_code:
-            case "JUL2":
-                new_data["JUL2"].append([station_code, measure_date, rre024i0])
-            case "URS2":
-                new_data["URS2"].append([station_code, measure_date, rre024i0])
-
-    os.remove("data/" + file.split("/")[1])
-
-    write_file(new_data["JUL2"], "data/_JUL2.csv")
-    write_file(new_data["URS2"], "data/_URS2.csv")
-
+def collect_rainfall(file: str, required: list[str], output_dir: str = "data/"):
+    _, (new_data,) = scan_source(file, [RainfallSplit(required, output_dir)], required[1], timestamps.RAINFALL_FORMAT, ";")
     return new_data
 
 
-def fuse_files(file1, file2, sep=","):
-    def common_elements(a1: list, a2: list):
-        return [i for i in a1 if i in a2]
+def fuse_rows(*tables: list[list[str]], how: str = "inner") -> list[list[str]]:
+    """
+    joins the tables (header first) of one station on the day of their measure_date
+    the header is the one of the first table plus the new columns of the following tables, every column is taken from
+    the first table providing it on that day
+    how:    inner - days present in every table, left - all days of the first table, outer - days of any table
+    """
+    assert how in ("inner", "left", "outer"), f"'{how}' must be either 'inner', 'left' or 'outer'"
 
-    def fuse_day(a1: list, a2: list) -> list:
-        new_line = []
-        for h in header:
-            if h in _header1:
-                new_line.append(a1[_header1.index(h)])
-            elif h in _header2:
-                new_line.append(a2[_header2.index(h)])
-            else:
-                raise ValueError("Invalid headers")
-        return new_line
+    header = []
+    for table in tables:
+        header += [h for h in table[0] if h not in header]
 
-    _data1, _header1 = read_file(file1, sep)
-    _data2, _header2 = read_file(file2, sep)
-
-    os.remove(file1)
-    os.remove(file2)
-
-    header = _header1 + [i for i in _header2 if i not in _header1]
-    data = [header]
+    assert len({table[1][0] for table in tables if len(table) > 1}) <= 1, "station code must be the same"
 
-    assert _data1[0][0] == _data2[0][0], "station code must be the same"
+    days_by_source = []
+    for table in tables:
+        index_measure_date = table[0].index("measure_date")
+        days_by_source.append({entry[index_measure_date].split(" ")[0]: entry for entry in table[1:]})
 
-    index_measure_date1 = _header1.index("measure_date")
-    index_measure_date2 = _header2.index("measure_date")
+    # (source, column index) of every output column, resolved once
+    projection = [[(s, table[0].index(h)) for s, table in enumerate(tables) if h in table[0]] for h in header]
 
-    _dict1 = {datetime.datetime.strptime(entry[index_measure_date1], "%Y-%m-%d %H:%M:%S%z").replace(hour=0, minute=0): entry for entry in _data1}
-    _dict2 = {datetime.datetime.strptime(entry[index_measure_date2], "%Y-%m-%d %H:%M:%S%z").replace(hour=0, minute=0): entry for entry in _data2}
+    match how:
+        case "inner":
+            days = [day for day in days_by_source[0] if all(day in other for other in days_by_source[1:])]
+        case "left":
+            days = list(days_by_source[0])
+        case _:
+            days = sorted(set().union(*days_by_source))
 
-    common_days = common_elements(list(_dict1.keys()), list(_dict2.keys()))
-
-    for day in common_days:
-        data.append(fuse_day(_dict1[day], _dict2[day]))
-
-    write_file(data, file1)
-    return header + data
-
-
-def get_trend(file: str, months: list[int], year_count: list[int], required_data: list[str], time_format="%Y-%m-%d %H:%M:%S%z"):
-    content, header = read_file(file)
-
-    used_index = [header.index(i) for i in required_data]
-    new_data = {}
-    compiled = [[header[i] for i in used_index]]
-
-    for dat in content:
-        try:
-            time = datetime.datetime.strptime(dat[header.index(required_data[1])], time_format)
-            if time.hour == 12 and time.minute == 0 and time.year in year_count and time.month in months:
-                new_data.setdefault(time.year, []).append(float(dat[used_index[-1]]))
-        except ValueError:
-            ...
-
-    for year, array in new_data.items():
-        average = sum(array) / len(array)
-        compiled.append((file.split("/")[0], str(year), str(average)))
-
-    write_file(compiled, "data/trend/" + file.split("/")[1])
-
-
-def main():
+    data = [header]
+    for day in days:
+        entries = [source.get(day) for source in days_by_source]
+        data.append([next((entries[s][i] for s, i in columns if entries[s] is not None), "") for columns in projection])
+    return data
+
+
+def _fuse_rows(*tables: list[list[str]], how: str = "inner") -> list[list[str]]:
+    """fuse_rows recorded as the fuse stage of its station"""
+    with instrument.stage("fuse", station=next((table[1][0] for table in tables if len(table) > 1), None)) as stage:
+        data = fuse_rows(*tables, how=how)
+        stage.rows = len(data) - 1
+    return data
+
+
+def fuse_files(*files: str, sep=",", how: str = "inner", output: str | None = None, remove: bool = True) -> list[list[str]]:
+    """
+    fuse_rows of the files of one station
+    the input files are removed (unless remove is False) and the result is written to output (default: the first file)
+    """
+    sources = [read_file(file, sep) for file in files]
+    if remove:
+        for file in files:
+            os.remove(file)
+
+    data = _fuse_rows(*[[header] + _data for _data, header in sources], how=how)
+    write_file(data, output or files[0])
+    return data
+
+
+def get_trend(file: str, months: list[int], year_count: list[int], required_data: list[str], time_format=timestamps.STATION_FORMAT):
+    trend = WinterTrend(required_data, months, year_count, "data/trend/" + file.split("/")[1], label=file.split("/")[0],
+                        columnar_copy=False)
+    _, (compiled,) = scan_source(file, [trend], required_data[1], time_format)
+    return compiled
+
+
+CACHE_DIR = ".compile_cache/"
+CACHE_VERSION = 5
+_BLOCK = 1 << 20
+
+STATIONS = ("JUL2", "URS2", "VAL2")
+RAINFALL_STATIONS = ("JUL2", "URS2")
+TRENDS = {"JUL2": list(range(1999, 2024)), "VAL2": list(range(1997, 2024))}
+WINTER = [11, 12, 1, 2, 3, 4]
+
+
+_hashed: dict[tuple, dict] = {}  # (file, stamp, end) -> fingerprint, see _fingerprint
+
+
+def _fingerprint(file: str, end: int | None = None, prefix: int | None = None) -> dict:
+    """
+    size and sha1 of the content of file[:end], read in blocks, and whether it ends with a complete line
+    the fingerprint of file[:prefix] is computed in the same pass, both are kept for the current stamp of file, so
+    checking an appended file, its offset and recording it reads the file only once
+    """
+    stamp = memo.stamp(file)
+    end = os.path.getsize(file) if end is None else end
+    if (file, stamp, end) in _hashed:
+        return _hashed[(file, stamp, end)]
+
+    digest = hashlib.sha1()
+    last = b""
+    position = 0
+    with open(file, "rb") as f:
+        for mark in sorted({end} | ({prefix} if prefix is not None and prefix < end else set())):
+            while position < mark:
+                block = f.read(min(mark - position, _BLOCK))
+                if not block:
+                    break
+                digest.update(block)
+                last = block
+                position += len(block)
+            _hashed[(file, stamp, mark)] = {"size": mark, "sha1": digest.hexdigest(), "complete": last.endswith(b"\n")}
+    return _hashed[(file, stamp, end)]
+
+
+def _load_manifest() -> dict:
+    try:
+        with open(CACHE_DIR + "manifest.json", "r") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return manifest if manifest.get("version") == CACHE_VERSION else {}
+
+
+def _save_manifest(manifest: dict) -> None:
+    manifest["version"] = CACHE_VERSION
+    with open(CACHE_DIR + "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _is_current(manifest: dict, key: str, inputs: list[str], params: dict, outputs: list[str]) -> bool:
+    """
+    True if the step ran before with the same parameters and inputs, inputs with a new mtime are hashed again
+    so files that were only touched or copied do not trigger a rebuild
+    """
+    entry = manifest.get(key)
+    if entry is None or entry["params"] != params or not all(os.path.exists(o) for o in outputs):
+        return False
+    if set(entry["inputs"]) != set(inputs):
+        return False
+
+    for file in inputs:
+        if not os.path.exists(file):
+            return False
+        if entry["inputs"][file]["stamp"] == list(memo.stamp(file)):
+            continue
+        # the previous size is hashed on the way, see _source_offset
+        if entry["inputs"][file]["fingerprint"] != _fingerprint(file, prefix=entry["inputs"][file]["fingerprint"]["size"]):
+            return False
+        entry["inputs"][file]["stamp"] = list(memo.stamp(file))
+    return True
+
+
+def _record(manifest: dict, key: str, inputs: list[str], params: dict) -> None:
+    manifest[key] = {"params": params, "inputs": {i: {"stamp": list(memo.stamp(i)), "fingerprint": _fingerprint(i)} for i in inputs}}
+    _save_manifest(manifest)
+
+
+class CompileStep(NamedTuple):
+    """
+    a job of the compile graph, it is started once every step in depends is done and gets their results appended to
+    its args, current is asked right before that and the step is skipped if it returns True
+    """
+    function: Callable
+    args: tuple
+    depends: tuple[str, ...] = ()
+    current: Callable[[], bool] | None = None
+
+
+def _run_graph(steps: dict[str, CompileStep], workers: int, on_done: Callable[[str, object], None]) -> dict:
+    """
+    runs every step as soon as its dependencies are done, on a pool of worker processes (workers=1 runs them in this
+    process), skipped steps have the result None, on_done is called in this process for every step that ran
+    """
+    pending = dict(steps)
+    done = {}
+    running = {}
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+
+    try:
+        while pending or running:
+            for key, step in list(pending.items()):
+                if not all(d in done for d in step.depends):
+                    continue
+                del pending[key]
+                if step.current is not None and step.current():
+                    done[key] = None
+                    continue
+                args = step.args + tuple(done[d] for d in step.depends)
+                if pool is None:
+                    done[key] = step.function(*args)
+                    on_done(key, done[key])
+                else:
+                    running[pool.submit(step.function, *args)] = key
+
+            if running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    key = running.pop(future)
+                    done[key] = future.result()
+                    on_done(key, done[key])
+            elif pending and not any(all(d in done for d in step.depends) for step in pending.values()):
+                raise ValueError(f"unresolvable dependencies in {list(pending)}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return done
+
+
+def _source_offset(manifest: dict, name: str, consumers: list) -> int | None:
+    """
+    None if the outputs of the consumers of the raw file are current, otherwise the byte offset to scan from
+    the offset is the previous size if the raw file only got new lines at its end and every consumer is appendable
+    """
+    key = "source:" + name
+    params = {type(consumer).__name__: consumer.params for consumer in consumers}
+    outputs = [output for consumer in consumers for output in consumer.outputs]
+
+    if _is_current(manifest, key, [name], params, outputs):
+        return None
+
+    entry = manifest.get(key)
+    if (entry is not None and entry["params"] == params and all(os.path.exists(o) for o in outputs)
+            and name in entry["inputs"] and all(consumer.appendable for consumer in consumers)):
+        previous = entry["inputs"][name]["fingerprint"]
+        if (previous["complete"] and os.path.getsize(name) > previous["size"]
+                and _fingerprint(name, previous["size"]) == previous):
+            return previous["size"]
+    return 0
+
+
+def _source_job(name: str, consumers: list, time_column: str, time_format: str, seperator: str,
+                offset: int) -> tuple[int, dict[str, list[list[str]]]]:
+    """one scan of a raw file, returns the rows read and the tables of the cache files it rebuilt"""
+    scanned, results = scan_source(name, consumers, time_column, time_format, seperator, start=offset)
+    tables = {}
+    for consumer, result in zip(consumers, results):
+        if isinstance(consumer, DailyExtract) and result is not None:
+            tables[consumer.output] = result
+        elif isinstance(consumer, RainfallSplit):
+            tables.update({consumer.output_dir + f"_{station}.csv": table for station, table in result.items()})
+    return scanned, tables
+
+
+def _fuse_job(inputs: list[str], output: str, *sources: tuple[int, dict] | None) -> int:
+    """fuses the cache files of one station into output, tables of sources compiled in this run are not read again"""
+    tables = {}
+    for source in sources:
+        if source is not None:
+            tables.update(source[1])
+    fused = []
+    for file in inputs:
+        if file in tables:
+            fused.append(tables[file])
+        else:
+            data, header = read_file(file)
+            fused.append([header] + data)
+    fused = _fuse_rows(*fused) if len(fused) > 1 else fused[0]
+    write_file(fused, output)
+    columnar.convert(output, fused)
+    return len(fused) - 1
+
+
+def main(force: bool = False, workers: int | None = None):
+    """
+    compiles raw/ into data/, every raw file is scanned once for all the outputs depending on it and the fused
+    station files are built from the tables of that scan
+    the raw files are scanned on a pool of worker processes (default: one per cpu, workers=1 compiles in this process)
+    and the fuse of a station starts as soon as its sources are compiled
+    sources and stations whose inputs and parameters did not change since the last run are skipped
+    """
     print("starting to compile ...")
-    edit_file("raw/JUL2.csv", ["station_code", "measure_date", "HS", "TA_30MIN_MEAN", "DW_30MIN_MEAN"])
-    edit_file("raw/URS2.csv", ["station_code", "measure_date", "HS", "TA_30MIN_MEAN", "DW_30MIN_MEAN"])
-    edit_file("raw/VAL2.csv", ["station_code", "measure_date", "HS", "TA_30MIN_MEAN", "DW_30MIN_MEAN"])
-    collect_rainfall("raw/niederschlag.csv", ["stn", "time", "rre024i0"])
-    get_trend("raw/JUL2.csv", [11, 12, 1, 2, 3, 4], list(range(1999, 2024)), ["station_code", "measure_date", "HS"])
-    get_trend("raw/VAL2.csv", [11, 12, 1, 2, 3, 4], list(range(1997, 2024)), ["station_code", "measure_date", "HS"])
-    print("basic completed, fusing the files ...")
-    fuse_files("data/JUL2.csv", "data/_JUL2.csv")
-    fuse_files("data/URS2.csv", "data/_URS2.csv")
-    print("Successfully compiled the files")
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    manifest = {} if force else _load_manifest()
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    sources = {}  # raw file -> consumers, time column, time format, seperator
+    required = ["station_code", "measure_date", "HS", "TA_30MIN_MEAN", "DW_30MIN_MEAN"]
+    for station in STATIONS:
+        # the rows are kept, _source_job hands them to the fuse step so it doesn't read the cache file again
+        consumers = [DailyExtract(required, CACHE_DIR + f"{station}.csv", keep_rows=True)]
+        if station in TRENDS:
+            consumers.append(WinterTrend(["station_code", "measure_date", "HS"], WINTER, TRENDS[station],
+                                         f"data/trend/{station}.csv", state=CACHE_DIR + f"trend_{station}.json"))
+        sources[f"raw/{station}.csv"] = (consumers, "measure_date", timestamps.STATION_FORMAT, ",")
+    sources["raw/niederschlag.csv"] = ([RainfallSplit(["stn", "time", "rre024i0"], CACHE_DIR)], "time",
+                                       timestamps.RAINFALL_FORMAT, ";")
+
+    steps = {}
+    for name, source in sources.items():
+        offset = _source_offset(manifest, name, source[0])
+        if offset is not None:
+            steps["source:" + name] = CompileStep(_source_job, (name, *source, offset))
+
+    fusing = {}  # step key -> cache files
+    for station in STATIONS:
+        inputs = [CACHE_DIR + f"{station}.csv"] + ([CACHE_DIR + f"_{station}.csv"] if station in RAINFALL_STATIONS else [])
+        depends = (f"source:raw/{station}.csv",) + (("source:raw/niederschlag.csv",) if station in RAINFALL_STATIONS else ())
+        outputs = [f"data/{station}.csv", os.path.join(columnar.directory(f"data/{station}.csv"), "schema.json")]
+        current = functools.partial(_is_current, manifest, "fuse:" + station, inputs, {}, outputs)
+        steps["fuse:" + station] = CompileStep(_fuse_job, (inputs, f"data/{station}.csv"),
+                                               tuple(d for d in depends if d in steps), current)
+        fusing["fuse:" + station] = inputs
+
+    def record(key: str, result) -> None:
+        if key in fusing:
+            print(f"fused ::: {key[5:]} ({result} days)")
+            _record(manifest, key, fusing[key], {})
+            memo.invalidate(f"data/{key[5:]}.csv")
+        else:
+            name = key[7:]
+            consumers = sources[name][0]
+            for output in (output for consumer in consumers for output in consumer.outputs):
+                memo.invalidate(output)
+            offset = steps[key].args[-1]
+            print(f"compiled ::: {name} ({'appended' if offset else 'scanned'} {result[0]} rows for "
+                  f"{', '.join(type(consumer).__name__ for consumer in consumers)})")
+            _record(manifest, key, [name], {type(consumer).__name__: consumer.params for consumer in consumers})
+
+    _run_graph(steps, workers, record)
+    _save_manifest(manifest)
+    print(f"Successfully compiled the files in {time.perf_counter() - start:.2f}s on {workers} worker(s)")
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="compiles raw/ into data/")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="number of compile processes (default: one per cpu)")
+    parser.add_argument("-f", "--force", action="store_true", help="compile everything, even unchanged sources")
+    parser.add_argument("--trace", default=None, help=f"records every stage to this file (.json: chrome trace, else json lines), like ${instrument.TRACE_ENV}")
+    parser.add_argument("--profile", default=None, help=f"runs this stage under cProfile, like ${instrument.PROFILE_ENV}")
+    args = parser.parse_args()
+    instrument.configure(args.trace, args.profile)
+    instrument.start()
+    main(args.force, args.workers)
+    instrument.finish()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           cube.py
+coded by:           Flyingfoxi
+"""
+
+import os
+
+import numpy as np
+
+import columnar
+import memo
+
+__all__ = ["StationCube", "station_files", "load"]
+
+# the cube of data/ holds every compiled station file as
+#   values[station, day, field]     float64, NaN where the station has no row for the day or no such field
+# over one calendar of consecutive days from the first to the last day of any station, so a date range, a station or
+# a field is a plain slice (a view) and statistics over stations are reductions along axis 0
+
+
+class StationCube:
+    """stations x days x fields matrix of the compiled station files on a shared calendar"""
+
+    def __init__(self, stations: list[str], days: np.ndarray, fields: list[str], values: np.ndarray):
+        assert values.shape == (len(stations), len(days), len(fields)), "values must be stations x days x fields"
+        self.stations = list(stations)
+        self.days = days
+        self.fields = list(fields)
+        self.values = values
+
+    @classmethod
+    def build(cls, files: list[str], fields: list[str] | None = None) -> "StationCube":
+        """reads the station files (from their columnar copies when up to date), fields defaults to every column found"""
+        loaded = {}
+        for file in files:
+            read = columnar.read(file)
+            loaded[os.path.basename(file).split(".")[0]] = read if read is not None else columnar.parse_csv(file)
+
+        if fields is None:
+            fields = list(dict.fromkeys(field for _, columns in loaded.values() for field in columns))
+        first = min(dates.min() for dates, _ in loaded.values())
+        last = max(dates.max() for dates, _ in loaded.values())
+        days = np.arange(first, last + 1, dtype="datetime64[D]")
+
+        values = np.full((len(loaded), len(days), len(fields)), np.nan)
+        for s, (dates, columns) in enumerate(loaded.values()):
+            index = (dates - first).astype(np.int64)
+            for f, field in enumerate(fields):
+                if field in columns:
+                    values[s, index, f] = columns[field]
+        return cls(list(loaded), days, fields, values)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.days.nbytes
+
+    def _index(self, names: list[str], selected: str | list[str] | None, kind: str) -> int | slice | list[int]:
+        """a name selects one entry (the axis is dropped), a list of adjacent names in order a slice, others a copy"""
+        if selected is None:
+            return slice(None)
+        try:
+            if isinstance(selected, str):
+                return names.index(selected)
+            index = [names.index(name) for name in selected]
+        except ValueError as ex:
+            raise ValueError(f"{kind} {selected} not in {names}") from ex
+        if index and index == list(range(index[0], index[0] + len(index))):
+            return slice(index[0], index[-1] + 1)
+        return index
+
+    def _range(self, start: str | np.datetime64 | None, end: str | np.datetime64 | None) -> slice:
+        """days from start to end, both included"""
+        first = 0 if start is None else int(np.clip((np.datetime64(start, "D") - self.days[0]).astype(np.int64), 0, len(self.days)))
+        last = len(self.days) if end is None else int(np.clip((np.datetime64(end, "D") - self.days[0]).astype(np.int64) + 1, 0, len(self.days)))
+        return slice(first, max(first, last))
+
+    def select(self, stations: str | list[str] | None = None, start: str | np.datetime64 | None = None,
+               end: str | np.datetime64 | None = None, fields: str | list[str] | None = None) -> np.ndarray:
+        """
+        values of the stations, the days from start to end (both included) and the fields, a single name drops its axis
+        the result is a view of the cube unless stations / fields is a list of names that are not adjacent in order
+        """
+        station_index = self._index(self.stations, stations, "station")
+        field_index = self._index(self.fields, fields, "field")
+        days = self._range(start, end)
+        if isinstance(station_index, list) or isinstance(field_index, list):
+            # a list and a name / list on both sides of the day slice would move their axes in front of the days
+            return self.values[station_index, days][..., field_index]
+        return self.values[station_index, days, field_index]
+
+    def subset(self, stations: str | list[str] | None = None, start: str | np.datetime64 | None = None,
+              end: str | np.datetime64 | None = None, fields: str | list[str] | None = None) -> "StationCube":
+        """like select, but keeps every axis and returns a cube (sharing its values where select would)"""
+        stations = [stations] if isinstance(stations, str) else stations
+        fields = [fields] if isinstance(fields, str) else fields
+        days = self._range(start, end)
+        return StationCube(self.stations if stations is None else stations, self.days[days],
+                           self.fields if fields is None else fields, self.select(stations, start, end, fields))
+
+    def across(self, field: str, how: str = "mean", start: str | np.datetime64 | None = None,
+               end: str | np.datetime64 | None = None) -> np.ndarray:
+        """one value per day over all stations (mean, min, max, median, std or count), NaN where no station has a value"""
+        values = self.select(None, start, end, field)
+        valid = ~np.isnan(values)
+        count = valid.sum(0)
+        if how == "count":
+            return count.astype(float)
+        reducers = {"mean": np.nanmean, "min": np.nanmin, "max": np.nanmax, "median": np.nanmedian, "std": np.nanstd}
+        if how not in reducers:
+            raise ValueError(f"'{how}' is not a valid reducer, use one of {list(reducers) + ['count']}")
+        result = np.full(values.shape[1], np.nan)
+        result[count > 0] = reducers[how](values[:, count > 0], axis=0)
+        return result
+
+    def points(self, key: str, value: str, stations: str | list[str] | None = None) -> tuple[np.ndarray, ...]:
+        """
+        every day of the stations where both key and value were measured, as flat columns:
+        index of the station, day, key and value (like the points of main.getArray(file, value, key) for all stations)
+        """
+        stations = [stations] if isinstance(stations, str) else stations
+        x = self.select(stations, fields=key).reshape(-1, len(self.days))
+        y = self.select(stations, fields=value).reshape(-1, len(self.days))
+        valid = ~(np.isnan(x) | np.isnan(y))
+        station_index, day_index = np.nonzero(valid)
+        if stations is not None:
+            station_index = np.array([self.stations.index(name) for name in stations])[station_index]
+        return station_index, self.days[day_index], x[valid], y[valid]
+
+
+def station_files(dir_: str = "data/") -> list[str]:
+    """the compiled station files in dir_, like main.plotJobs lists them"""
+    return [os.path.join(dir_, file) for file in sorted(os.listdir(dir_)) if file.endswith(".csv") and "trend" not in file]
+
+
+_cubes = memo.LRUCache("cube")
+
+
+def load(dir_: str = "data/", fields: list[str] | None = None) -> StationCube:
+    """the cube of every station file in dir_, built once and kept until one of the files changes (see memo)"""
+    files = station_files(dir_)
+    stamps = tuple(memo.stamp(file) for file in files)
+    return _cubes.get((dir_, stamps, None if fields is None else tuple(fields)),
+                      lambda: StationCube.build(files, fields), lambda cube: cube.nbytes)
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           instrument.py
+coded by:           Flyingfoxi
+"""
+
+import cProfile
+import glob
+import json
+import os
+import pstats
+import resource
+import time
+
+__all__ = ["TRACE_ENV", "PROFILE_ENV", "configure", "enabled", "stage", "span", "start", "finish", "read_trace",
+           "chrome_trace"]
+
+# opt-in, both are read from the environment so worker processes of the pools inherit them
+TRACE_ENV = "METEO_TRACE"        # file the stage records are written to, .json for a chrome trace, json lines otherwise
+PROFILE_ENV = "METEO_PROFILE"    # name of one stage that is run under cProfile, the stats are written to <stage>.prof
+
+# every record is one json line
+#   {"stage": "fuse", "station": "JUL2", ..., "pid": 812, "start": 1792..., "wall": 0.08, "cpu": 0.08, "rows": 5844,
+#    "peak_rss_mb": 153.2}
+# labels like station, field or typ are stored next to the stage name, peak_rss_mb is the peak resident memory while
+# the stage ran: the high-water mark of the process is reset (/proc/self/clear_refs) when a stage is entered, where that
+# is not possible (not linux) it is the peak of the process so far
+
+
+def configure(trace: str | None = None, profile: str | None = None) -> None:
+    """turns on tracing to the file trace and / or profiling of the stage profile for this and all child processes"""
+    if trace:
+        os.environ[TRACE_ENV] = trace
+    if profile:
+        os.environ[PROFILE_ENV] = profile
+
+
+def enabled() -> bool:
+    return bool(os.environ.get(TRACE_ENV) or os.environ.get(PROFILE_ENV))
+
+
+def _records_file() -> str | None:
+    trace = os.environ.get(TRACE_ENV)
+    if not trace:
+        return None
+    return trace + "l" if trace.endswith(".json") else trace
+
+
+_profiler: cProfile.Profile | None = None
+_open: list["Stage"] = []  # entered stages of this process, innermost last
+
+
+def _high_water() -> float:
+    """peak resident memory in MB since the last _reset_high_water"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        ...
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _reset_high_water() -> None:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        ...
+
+
+class Stage:
+    """
+    measures the wall time, cpu time and rows of one stage, it can be entered several times (e.g. once per block)
+    and the record is written when it is closed
+    """
+
+    def __init__(self, name: str, labels: dict, close_on_exit: bool = True):
+        self.name = name
+        self.labels = labels
+        self.rows = None
+        self.start = None
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak = 0.0
+        self._close_on_exit = close_on_exit
+        self._profile = os.environ.get(PROFILE_ENV) == name
+
+    def __enter__(self):
+        global _profiler
+        if self.start is None:
+            self.start = time.time()
+        if self._profile:
+            _profiler = _profiler or cProfile.Profile()
+            _profiler.enable()
+        # the outer stages keep their peak so far, the reset only starts a new one for this stage
+        if _open:
+            peak = _high_water()
+            for outer in _open:
+                outer.peak = max(outer.peak, peak)
+        _open.append(self)
+        _reset_high_water()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *_):
+        self.wall += time.perf_counter() - self._wall
+        self.cpu += time.process_time() - self._cpu
+        self.peak = max(self.peak, _high_water())
+        _open.remove(self)
+        if self._profile:
+            _profiler.disable()
+            _profiler.dump_stats(f"{self.name}.{os.getpid()}.prof")
+        if self._close_on_exit:
+            self.close()
+
+    def close(self) -> None:
+        file = _records_file()
+        if file is None or self.start is None:
+            return
+        record = {"stage": self.name, **self.labels, "pid": os.getpid(), "start": self.start, "wall": self.wall,
+                  "cpu": self.cpu, "rows": self.rows,
+                  "peak_rss_mb": self.peak}
+        with open(file, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+class _Disabled:
+    """stand-in while instrumentation is off, it does nothing"""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+_DISABLED = _Disabled()
+
+
+def stage(name: str, **labels) -> Stage | _Disabled:
+    """
+    context manager measuring one stage, labels (station, field, ...) are stored with the record
+    set .rows on the returned object to record how many rows the stage handled
+    """
+    return Stage(name, labels) if enabled() else _DISABLED
+
+
+def span(name: str, **labels) -> Stage | _Disabled:
+    """like stage, but it can be entered any number of times and is recorded once close() is called"""
+    return Stage(name, labels, close_on_exit=False) if enabled() else _DISABLED
+
+
+def start() -> None:
+    """clears the records and profiles of an earlier run, call it before the work starts"""
+    file = _records_file()
+    if file is not None:
+        open(file, "w").close()
+    if os.environ.get(PROFILE_ENV):
+        for prof in glob.glob(f"{os.environ[PROFILE_ENV]}.*.prof"):
+            os.remove(prof)
+
+
+def read_trace(file: str) -> list[dict]:
+    with open(file, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def chrome_trace(records: list[dict]) -> dict:
+    """the records as complete events of the chrome trace format (chrome://tracing, perfetto)"""
+    events = []
+    for record in records:
+        args = {k: v for k, v in record.items() if k not in ("stage", "pid", "start", "wall")}
+        label = " ".join(str(v) for k, v in record.items() if k in ("station", "field", "typ") and v is not None)
+        events.append({"name": f"{record['stage']} {label}".strip(), "cat": record["stage"], "ph": "X",
+                       "ts": record["start"] * 1e6, "dur": record["wall"] * 1e6, "pid": record["pid"],
+                       "tid": record["pid"], "args": args})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def finish() -> None:
+    """
+    writes the chrome trace if one was asked for, merges the profiles of all processes into <stage>.prof
+    and prints the total time of every stage
+    """
+    file = _records_file()
+    if file is not None and os.path.exists(file):
+        records = read_trace(file)
+        if os.environ[TRACE_ENV].endswith(".json"):
+            with open(os.environ[TRACE_ENV], "w") as f:
+                json.dump(chrome_trace(records), f)
+            os.remove(file)
+
+        totals = {}
+        for record in records:
+            total = totals.setdefault(record["stage"], [0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += record["wall"]
+            total[2] += record["cpu"]
+        print(f"stages recorded in {os.environ[TRACE_ENV]}:")
+        for name, (count, wall, cpu) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            print(f"    {name:<12} {count:>5}x  wall {wall:8.2f}s  cpu {cpu:8.2f}s")
+
+    profile = os.environ.get(PROFILE_ENV)
+    if profile:
+        files = glob.glob(f"{profile}.*.prof")
+        if files:
+            stats = pstats.Stats(*files)
+            stats.dump_stats(f"{profile}.prof")
+            for prof in files:
+                os.remove(prof)
+            print(f"profile of '{profile}' written to {profile}.prof, top functions:")
+            stats.sort_stats("cumulative").print_stats(15)
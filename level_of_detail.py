@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           level_of_detail.py
+coded by:           Flyingfoxi
+"""
+
+import numpy as np
+
+__all__ = ["minmax", "thin_points"]
+
+
+def minmax(x: np.ndarray, y: np.ndarray, buckets: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    decimates a line to the first, the last, the lowest and the highest point of each of buckets equally wide x ranges
+    (one per pixel column), at that resolution the line is drawn the same as with all of its points (m4 decimation)
+    lines with no more than 4 * buckets points are returned unchanged
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if buckets < 1 or len(x) <= 4 * buckets:
+        return x, y
+
+    order = np.argsort(x, kind="stable")
+    x, y = x[order], y[order]
+    span = x[-1] - x[0]
+    bucket = np.zeros(len(x), dtype=np.int64) if span == 0 else np.minimum(((x - x[0]) / span * buckets).astype(np.int64), buckets - 1)
+
+    # bucket is ascending, so the first / last point of a bucket is where it changes, ordered by y within a bucket
+    # the first point is the minimum and the last one the maximum
+    first = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    last = np.r_[first[1:], len(x)] - 1
+    by_value = np.lexsort((y, bucket))
+
+    keep = np.unique(np.concatenate((first, last, by_value[first], by_value[last])))
+    return x[keep], y[keep]
+
+
+def thin_points(x: np.ndarray, y: np.ndarray, extent: tuple[float, float, float, float],
+                cells: tuple[int, int]) -> np.ndarray:
+    """
+    indices of the points to draw of a scatter, one per cell of a cells[0] x cells[1] grid over extent, the view of
+    the axes (x min, x max, y min, y max), points sharing a cell would cover the same pixels, the last one (drawn on top)
+    is kept, points outside extent are not thinned
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if cells[0] < 1 or cells[1] < 1:
+        return np.arange(len(x))
+
+    def cell(values: np.ndarray, low: float, high: float, count: int) -> np.ndarray:
+        if high <= low:
+            return np.zeros(len(values), dtype=np.int64)
+        return np.clip(((values - low) / (high - low) * count).astype(np.int64), 0, count - 1)
+
+    inside = np.flatnonzero((x >= extent[0]) & (x <= extent[1]) & (y >= extent[2]) & (y <= extent[3]))
+    ids = cell(x[inside], extent[0], extent[1], cells[0]) * cells[1] + cell(y[inside], extent[2], extent[3], cells[1])
+    kept = inside[len(ids) - 1 - np.unique(ids[::-1], return_index=True)[1]]
+    outside = np.ones(len(x), dtype=bool)
+    outside[inside] = False
+    return np.sort(np.concatenate((np.flatnonzero(outside), kept)))
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           memo.py
+coded by:           Flyingfoxi
+"""
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable
+
+__all__ = ["BUDGET_ENV", "LRUCache", "stamp", "invalidate"]
+
+BUDGET_ENV = "METEO_CACHE_MB"   # memory budget of every cache in MB, read when the cache is created
+DEFAULT_BUDGET_MB = 512
+
+# every key of a cache is a tuple starting with the path of the file the value was computed from, followed by its
+# stamp (see stamp) and the arguments, e.g. ("data/JUL2.csv", (1792..., 4096), "array", "HS", "week", "mean")
+# a rewritten file gets a new stamp and so new keys, invalidate frees the entries of the old contents right away
+
+_caches: "weakref.WeakSet[LRUCache]" = weakref.WeakSet()
+
+
+def stamp(file: str) -> tuple[int, int]:
+    """mtime and size of file, part of every key"""
+    stat = os.stat(file)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LRUCache:
+    """
+    least recently used cache with a memory budget, values are evicted (oldest use first) once their estimated
+    size exceeds it, a single value larger than the budget is returned but not kept
+    """
+
+    def __init__(self, name: str, budget: int | None = None):
+        self.name = name
+        self.budget = int(float(os.environ.get(BUDGET_ENV, DEFAULT_BUDGET_MB)) * 2 ** 20) if budget is None else budget
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._entries: OrderedDict[tuple, tuple[object, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: tuple, compute: Callable[[], object], size: Callable[[object], int]) -> object:
+        """the cached value of key, compute() is called on a miss and size(value) estimates its bytes"""
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = compute()
+        nbytes = size(value)
+        with self._lock:
+            if key not in self._entries and nbytes <= self.budget:
+                # entries of older contents of the file can't be hit again
+                for stale in [k for k in self._entries if k[0] == key[0] and k[1] != key[1]]:
+                    self.nbytes -= self._entries.pop(stale)[1]
+                self._entries[key] = (value, nbytes)
+                self.nbytes += nbytes
+                self._evict()
+        return value
+
+    def _evict(self) -> None:
+        while self.nbytes > self.budget:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.nbytes -= nbytes
+            self.evictions += 1
+
+    def resize(self, budget: int) -> None:
+        """sets a new budget in bytes, entries are evicted until they fit"""
+        with self._lock:
+            self.budget = budget
+            self._evict()
+
+    def invalidate(self, path: str | None = None) -> int:
+        """
+        drops the entries of the file path or of all files below the directory path (all with None), entries of
+        a directory are dropped with every file in it, returns the count
+        """
+        with self._lock:
+            if path is None:
+                dropped = list(self._entries)
+            else:
+                path = os.path.abspath(path)
+                dropped = [key for key in self._entries if _related(os.path.abspath(key[0]), path)]
+            for key in dropped:
+                self.nbytes -= self._entries.pop(key)[1]
+        return len(dropped)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "nbytes": self.nbytes, "budget": self.budget, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+
+def _related(a: str, b: str) -> bool:
+    """True if a and b are the same path or one of them is inside the other"""
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+
+def invalidate(path: str | None = None) -> int:
+    """invalidates path (a file or a directory, everything with None) in every cache of this process"""
+    return sum(cache.invalidate(path) for cache in list(_caches))
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           plotting.py
+coded by:           Flyingfoxi
+"""
+
+import json
+from typing import TYPE_CHECKING, Dict, Iterable
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.colors import ListedColormap
+
+import calendar_index
+import level_of_detail
+import trends
+from arrays import CompactArray
+
+if TYPE_CHECKING:
+    from arrays import Array
+
+__all__ = ["plotArray", "figureTemplate", "closeTemplates", "labelingConfig"]
+
+font_header = {"style": "normal", "name": "Arial", "size": 18}
+font_labeling = {"style": "normal", "name": "Arial", "size": 14}
+font_ticks = {"style": "italic", "name": "Arial", "size": 10}
+
+# level of detail: lines keep the first, last, lowest and highest point of every LINE_PIXELS wide column of the axes
+# and the dependent scatters one point per SCATTER_PIXELS x SCATTER_PIXELS cell, None draws every point
+LINE_PIXELS: float | None = 1
+SCATTER_PIXELS: float | None = 2
+
+
+def _lineDetail(ax: plt.Axes, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """x and y of a line decimated to the pixel columns of ax, see LINE_PIXELS"""
+    if not LINE_PIXELS:
+        return x, y
+    return level_of_detail.minmax(x, y, int(ax.get_window_extent().width / LINE_PIXELS))
+
+
+class _FigureTemplate:
+    """
+    figure of one kind of graph: axes, ticks, labels and colorbars are built once, the lines / scatters, the title and
+    the text of a graph are updated in place, so the same figure can be saved for every station
+    """
+
+    def __init__(self, array_data: "Array | CompactArray", colormap: str | list[str], kind: str):
+        self.fig, self.ax = plt.subplots(figsize=(24, 8) if kind == "linear" else (16, 10))
+        self.lines = []
+        self.scatters = []
+        self.text = None
+
+        if kind == "points":
+            first, last = _yearRange(array_data)
+            sm = plt.cm.ScalarMappable(cmap=colormap, norm=plt.Normalize(vmin=first, vmax=last))
+            plt.colorbar(sm, ax=self.ax)
+        _xy_labeling(array_data, self.ax)
+        if kind == "linear":
+            self.text = self.ax.text(self.ax.get_xlim()[1] * 0.99, self.ax.get_ylim()[1] * 0.972, "", style='italic', fontsize=10,
+                                     bbox={"facecolor": "lightgrey", "alpha": 0.5, "pad": 5}, ha="right", va="top")
+
+    def line(self, index: int, x: np.ndarray, y: np.ndarray, color) -> None:
+        if index < len(self.lines):
+            self.lines[index].set_data(x, y)
+            self.lines[index].set_color(color)
+        else:
+            self.lines.extend(self.ax.plot(x, y, color=color))
+
+    def scatter(self, index: int, x: np.ndarray, y: np.ndarray, color, label: str) -> None:
+        if index < len(self.scatters):
+            self.scatters[index].set_offsets(np.column_stack((x, y)))
+            self.scatters[index].set_color(color)
+            self.scatters[index].set_label(label)
+        else:
+            # noinspection PyTypeChecker
+            self.scatters.append(self.ax.scatter(x, y, color=color, label=label, s=3))
+
+    def finish(self, array_data: "Array | CompactArray", lines: int = 0, scatters: int = 0) -> None:
+        """empties the lines / scatters a previous station used beyond the first lines / scatters and sets the title"""
+        for line in self.lines[lines:]:
+            line.set_data([], [])
+        for scatter in self.scatters[scatters:]:
+            scatter.set_offsets(np.zeros((0, 2)))
+        title = labelingConfig(array_data)["title"]
+        if title is not None:
+            self.ax.set_title(title, fontdict=font_header)
+
+
+_templates: Dict[str, _FigureTemplate] = {}
+
+
+def figureTemplate(array_data: "Array | CompactArray", colormap: str | list[str], kind: str) -> _FigureTemplate:
+    """the cached template of a graph, graphs with the same kind, colormap and labeling (apart from the title) share one"""
+    config = labelingConfig(array_data)
+    config["title"] = None
+    key = json.dumps([kind, colormap, config, _yearRange(array_data) if kind == "points" else None], default=str)
+    if key not in _templates:
+        _templates[key] = _FigureTemplate(array_data, colormap, kind)
+    return _templates[key]
+
+
+def closeTemplates() -> None:
+    for template in _templates.values():
+        plt.close(template.fig)
+    _templates.clear()
+
+
+def _plotPointArray(array_data: "Array | CompactArray", colormap, template: _FigureTemplate | None = None):
+    template = template or _FigureTemplate(array_data, colormap, "points")
+    nested = array_data.data
+
+    shown = None
+    if SCATTER_PIXELS and nested:
+        # one grid over the view of the axes (its limits are set by the template) and the points of all years,
+        # a cell keeps the point of the year drawn last, it covers the others
+        box = template.ax.get_window_extent()
+        cells = (int(box.width / SCATTER_PIXELS), int(box.height / SCATTER_PIXELS))
+        x_all = np.concatenate([np.asarray(year["x_map"], dtype=float) for year in nested.values()])
+        y_all = np.concatenate([np.asarray(year["y_map"], dtype=float) for year in nested.values()])
+        extent = (*sorted(template.ax.get_xlim()), *sorted(template.ax.get_ylim()))
+        kept = np.zeros(len(x_all), dtype=bool)
+        kept[level_of_detail.thin_points(x_all, y_all, extent, cells)] = True
+        shown = np.split(kept, np.cumsum([len(year["x_map"]) for year in nested.values()])[:-1])
+
+    # colours as on the colorbar of the template
+    first, last = _yearRange(array_data)
+    for index, (yi, year) in enumerate(nested.items()):
+        color = getattr(plt.cm, colormap)((yi - first) / max(last - first, 1))
+        x_map, y_map = np.asarray(year["x_map"], dtype=float), np.asarray(year["y_map"], dtype=float)
+        if shown is not None:
+            x_map, y_map = x_map[shown[index]], y_map[shown[index]]
+        template.scatter(index, x_map, y_map, color, str(yi))
+
+    template.finish(array_data, scatters=len(nested))
+    return plt
+
+
+def _flatData(array_data: "Array | CompactArray") -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """year, outer key, inner key and value columns of a day / week / month array"""
+    if isinstance(array_data, CompactArray):
+        yi, oi, ii = np.nonzero(~np.isnan(array_data.values))
+        return array_data.years[yi], array_data.outer[oi], array_data.inner[ii], array_data.values[yi, oi, ii]
+
+    rows = [(yi, mi, di, value) for yi, year in array_data.data.items() for mi, month in year.items() for di, value in month.items()]
+    if not rows:
+        return tuple(np.zeros(0, dtype=dtype) for dtype in (np.int64, np.int64, np.int64, float))
+    years, outer, inner, values = (np.array(column) for column in zip(*rows))
+    return years, outer, inner, values.astype(float)
+
+
+def _xPositions(typ: str, years: np.ndarray, outer: np.ndarray, inner: np.ndarray, origin: np.ndarray | int) -> np.ndarray:
+    """
+    x position of every entry counted in days from the 1st of january of origin (one year for all or one per entry)
+    day / month arrays are placed on their date (1st of january = 1), weeks on week * 7 + weekday
+    """
+    origin = calendar_index.year_starts(origin)
+    if typ == "week":
+        return calendar_index.day_offsets(calendar_index.year_starts(years), origin) + (outer - 1) * 7 + inner
+    return calendar_index.day_offsets(calendar_index.from_keys(years, outer, inner), origin) + 1
+
+
+def _yearRange(array_data: "Array | CompactArray") -> tuple[int, int]:
+    years = array_data.years if isinstance(array_data, CompactArray) else list(array_data.data.keys())
+    if len(years) == 0:
+        return 2008, 2023
+    return int(min(years)), int(max(years))
+
+
+def _yearColors(colormap: list, first: int, last: int) -> list[tuple]:
+    """
+    colour of every year first ... last, the colours of colormap spread over the years (repeated when there are more
+    years than colours), shared by the lines of the stacked graphs and their colorbar
+    """
+    return [tuple(color) for color in ListedColormap(colormap)(np.linspace(0, 1, last - first + 1))]
+
+
+def _plotStackingArray(array_data: "Array | CompactArray", colormap: list, template: _FigureTemplate | None = None):
+    array_data.colormap = colormap
+    template = template or _FigureTemplate(array_data, colormap, "stacked")
+    years, outer, inner, values = _flatData(array_data)
+    first, last = _yearRange(array_data)
+    colors = _yearColors(array_data.colormap, first, last)
+
+    unique_years = np.unique(years).tolist()
+    for index, year in enumerate(unique_years):
+        color = colors[year - first]
+
+        # the year itself, the december before (monthly) and the beginning of the next year for the smooth transition of years
+        selected = (years == year) | (years == year + 1)
+        if array_data.typ == "month":
+            selected |= (years == year - 1) & (outer == 12)
+
+        x_map = _xPositions(array_data.typ, years[selected], outer[selected], inner[selected], year)
+        near = x_map <= 366 + 31
+        template.line(index, *_lineDetail(template.ax, x_map[near], values[selected][near]), color=color)
+
+    template.finish(array_data, lines=len(unique_years))
+    return plt
+
+
+def _plotLinearArray(array_data: "Array | CompactArray", colormap, template: _FigureTemplate | None = None):
+    assert (colormap in colormaps), "colormap must be available in matplotlib.colormap"
+
+    array_data.colormap = colormap
+    template = template or _FigureTemplate(array_data, colormap, "linear")
+    color = getattr(plt.cm, array_data.colormap)(0.7)
+
+    years, outer, inner, y = _flatData(array_data)
+    x = _xPositions(array_data.typ, years, outer, inner, _yearRange(array_data)[0])
+
+    slope, intercept, _, _ = (float(v[0]) for v in trends.fit(x, y))
+    x, y = _lineDetail(template.ax, x, y)
+    trend_line = slope * x + intercept
+
+    template.line(0, x, y, color=color)
+    template.line(1, x, trend_line, color='darkred')
+    template.text.set_text(f"Equation of the trend line: y = {slope:.5f}x + {intercept:.2f}")
+
+    template.finish(array_data, lines=2)
+    return plt
+
+
+def plotArray(array_data: "Array | CompactArray", colormap: str | list[str], plot_typ: str = "stacked",
+              template: _FigureTemplate | None = None) -> plt:
+    """draws the graph on a new figure, or on template (see figureTemplate) which is updated in place"""
+    assert (plot_typ in ("stacked", "linear")), f"'{plot_typ}' must be either 'stacked' or 'linear'"
+
+    array_data.plot_typ = plot_typ
+
+    if array_data.typ == "points":
+        return _plotPointArray(array_data, colormap, template)
+
+    if plot_typ == "stacked":
+        return _plotStackingArray(array_data, colormap, template)
+    else:
+        return _plotLinearArray(array_data, colormap, template)
+
+
+def labelingConfig(array_data: "Array | CompactArray") -> dict:
+    """titles, labels, limits and ticks of a graph as plain data, applied by _xy_labeling, part of the render fingerprint in main"""
+    config = {"title": None, "colorbar": None, "axes": []}
+
+    for i, typ in enumerate("xy"):
+
+        enable_ticks = True
+        ticks = []
+        tick_labels: Iterable | None = None
+        label = ""
+
+        match array_data.columns[i]:
+            case "HS":
+                config["title"] = "Schneehöhe von " + array_data.name + f" ({array_data.display_typ})"
+                label = "Schneehöhe [cm]"
+                lim = (0, 350)
+                ticks = [i for i in range(0, 400, 50)]
+            case "TA_30MIN_MEAN":
+                config["title"] = "Temperatur von " + array_data.name + f" ({array_data.display_typ})"
+                label = "Temperatur [°C]"
+                lim = (-20, 40)
+                ticks = [i for i in range(-20, 50, 10)]
+            case "DW_30MIN_MEAN":
+                enable_ticks = True
+                config["title"] = "Windrichtung von " + array_data.name + f" ({array_data.display_typ})"
+                label = "Windrichtung [°]"
+                ticks = [int(i) for i in range(0, 361, 30)]
+                tick_labels = [f"Norden - {i}" if i == 0 or i == 360 else
+                               f"Osten - {i}" if i == 90 else
+                               f"Süden - {i}" if i == 180 else
+                               f"Westen - {i}" if i == 270 else
+                               f"{i}" for i in ticks]
+                lim = (0, 360)
+            case "rre024i0":
+                config["title"] = "Niederschlagsmenge von " + array_data.name + f" ({array_data.display_typ})"
+                label = "Niederschlagsmenge [mm/Tag]"
+                if array_data.typ == "day":
+                    lim = (0, 1200)
+                    ticks = [i for i in range(0, 1300, 100)]
+                elif array_data.typ == "week" and array_data.reducer == "sum":
+                    label = "Niederschlagsmenge [mm/Woche]"
+                    lim = (0, 2000)
+                    ticks = [i for i in range(0, 2001, 250)]
+                elif array_data.typ == "week":
+                    lim = (0, 350)
+                    ticks = [i for i in range(0, 400, 50)]
+                elif array_data.typ == "month" and array_data.reducer == "sum":
+                    label = "Niederschlagsmenge [mm/Monat]"
+                    lim = (0, 3000)
+                    ticks = [i for i in range(0, 3001, 250)]
+                elif array_data.typ == "month":
+                    lim = (0, 120)
+                    ticks = [i for i in range(0, 130, 10)]
+                else:
+                    lim = (0, 500)
+                    ticks = [i for i in range(0, 501, 75)]
+
+            case "measure_date":
+                enable_ticks = True
+
+                first, last = _yearRange(array_data)
+                if array_data.plot_typ == "stacked":
+                    tick_labels = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec', 'Jan']
+                    # the axis spans 366 days, so the months of a leap year are marked if one is drawn
+                    years = np.arange(first, last + 1)
+                    leap = years[calendar_index.year_lengths(years) == 366]
+                    ticks = calendar_index.month_boundaries(int(leap[0]) if len(leap) else first).tolist()
+                    lim = (0, 366)
+                    config["colorbar"] = (first, last + 1)
+
+                else:
+                    tick_labels = [str(i) for i in range(first, last + 2)]
+                    ticks = calendar_index.year_boundaries(first, last + 1).tolist()
+                    lim = (0, ticks[-1])
+
+            case other:
+                raise ValueError(f"'{other}' is not a valid column")
+
+        if enable_ticks and tick_labels is None:
+            tick_labels = [str(i) for i in ticks]
+        config["axes"].append({"axis": typ, "label": label, "lim": list(lim),
+                               "ticks": list(ticks) if enable_ticks else None,
+                               "tick_labels": list(tick_labels) if enable_ticks else None})
+
+    return config
+
+
+def _xy_labeling(array_data: "Array | CompactArray", ax: plt.Axes) -> None:
+    config = labelingConfig(array_data)
+
+    if config["title"] is not None:
+        plt.title(config["title"], fontdict=font_header)
+
+    if config["colorbar"]:
+        first, end = config["colorbar"]
+        cmap = ListedColormap(_yearColors(array_data.colormap, first, end - 1))
+
+        sm = plt.cm.ScalarMappable(cmap=cmap, norm=plt.Normalize(first, vmax=end))
+        cb = plt.colorbar(sm, ax=ax)
+        cmap_ticks = [i + 0.5 for i in range(first, end, 1)]
+        cb.ax.set_ylim(first, end)
+        cb.ax.set_yticks(cmap_ticks)
+        cb.ax.set_yticklabels([str(int(i)) for i in cmap_ticks], fontdict=font_ticks)
+
+    for axis in config["axes"]:
+        typ = axis["axis"]
+        if axis["ticks"] is not None:
+            getattr(ax, "set_" + typ + "ticks")(axis["ticks"])
+            getattr(ax, "set_" + typ + "ticklabels")(axis["tick_labels"], fontdict=font_ticks)
+        getattr(ax, "set_" + typ + "lim")(axis["lim"])
+        getattr(ax, "set_" + typ + "label")(axis["label"], fontdict=font_labeling)
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           raw_reader.py
+coded by:           Flyingfoxi
+"""
+
+import datetime
+import mmap
+import os
+from typing import Iterable, Iterator
+
+import numpy as np
+
+import memo
+import timestamps
+
+__all__ = ["RawFile", "open_raw"]
+
+_NEWLINE = ord("\n")
+
+
+class RawFile:
+    """
+    memory mapped raw export, lines and fields are located on the mapped bytes and only the requested
+    columns of the rows passing the time filter are decoded
+    """
+
+    def __init__(self, path: str, sep: str = ","):
+        self.path = path
+        self.sep = sep
+        self.size = os.path.getsize(path)
+
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+
+        header_end = self._map.find(b"\n")
+        header_end = self.size if header_end == -1 else header_end
+        self.header = self._map[:header_end].decode().rstrip("\r").split(sep)
+        self.data_start = min(header_end + 1, self.size)
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            try:
+                self._map.close()
+            except BufferError:
+                ...  # a caller still holds a view of the mapping, it is released with the last reference
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _blocks(self, start: int, block_size: int) -> Iterator[tuple[int, int]]:
+        """[begin, end) ranges of whole lines of about block_size bytes"""
+        begin = max(start, self.data_start)
+        while begin < self.size:
+            end = self._map.find(b"\n", min(begin + block_size, self.size) - 1)
+            end = self.size if end == -1 else end + 1
+            yield begin, end
+            begin = end
+
+    def select(self, columns: list[str], time_column: str, time_format: str, years: Iterable[int], hour: int = 12,
+               minute: int = 0, start: int = 0, block_size: int = 1 << 23, with_dates: bool = False) -> Iterator:
+        """
+        yields, block by block, the requested columns of every row whose timestamp lies at hour:minute in one of years
+        start is a byte offset, lines before it are skipped (it has to point to the beginning of a line)
+        with_dates yields (rows, dates) instead, dates holds the day of every row as datetime64[D]
+        """
+        used_index = [self.header.index(c) for c in columns]
+        time_index = self.header.index(time_column)
+        years = np.fromiter(years, dtype=np.int64)
+        layout = timestamps.fixed_layout(time_format)
+        if layout is not None and not {"Y", "m", "d", "H"} <= layout[0].keys():
+            layout = None
+
+        for begin, end in self._blocks(start, block_size):
+            buf = np.frombuffer(self._map, dtype=np.uint8, count=end - begin, offset=begin)
+
+            newlines = np.flatnonzero(buf == _NEWLINE)
+            line_starts = np.concatenate(([0], newlines + 1))
+            line_ends = np.concatenate((newlines, [len(buf)]))
+            filled = line_ends > line_starts
+            line_starts, line_ends = line_starts[filled], line_ends[filled]
+
+            if layout is None:
+                selected, dates = self._select_parsed(buf, line_starts, line_ends, time_index, time_format, years, hour, minute)
+            else:
+                selected, dates = self._select_fixed(buf, line_starts, line_ends, time_index, time_format, layout, years, hour, minute)
+
+            rows = []
+            for s, e in zip(line_starts[selected].tolist(), line_ends[selected].tolist()):
+                dat = bytes(buf[s:e]).decode().rstrip("\r").split(self.sep)
+                rows.append([dat[i] for i in used_index])
+            yield (rows, dates[selected]) if with_dates else rows
+
+    def _select_fixed(self, buf: np.ndarray, line_starts: np.ndarray, line_ends: np.ndarray, time_index: int,
+                      time_format: str, layout: tuple[dict[str, slice], int, dict[int, int]], years: np.ndarray, hour: int,
+                      minute: int) -> tuple[np.ndarray, np.ndarray]:
+        length = layout[1]
+        separators = np.flatnonzero(buf == self.sep.encode()[0])
+
+        # start of the time field: the (time_index)th separator after the start of the line
+        if time_index == 0:
+            field_starts = line_starts
+            found = np.ones(len(line_starts), dtype=bool)
+        else:
+            position = np.searchsorted(separators, line_starts) + time_index - 1
+            found = position < len(separators)
+            field_starts = separators[np.minimum(position, len(separators) - 1)] + 1 if len(separators) else line_starts
+            found &= field_starts <= line_ends
+
+        # end of the time field: the next separator or the end of the line (without a \r)
+        next_separator = np.searchsorted(separators, field_starts)
+        field_ends = line_ends.copy()
+        followed = next_separator < len(separators)
+        field_ends[followed] = np.minimum(separators[next_separator[followed]], line_ends[followed])
+        field_ends -= (field_ends == line_ends) & (buf[np.maximum(field_ends - 1, 0)] == ord("\r"))
+
+        ok = found & (field_ends - field_starts >= length)
+        values = timestamps.read_fields(buf, np.where(ok, field_starts, 0), layout, ok)
+        timestamps.utc_offsets(buf, field_starts + length, field_ends - field_starts - length, time_format, ok)
+        dates = timestamps.from_fields(values, ok).astype("datetime64[D]")
+
+        selected = ok & (values["H"] == hour)
+        if "M" in values:
+            selected &= values["M"] == minute
+        elif minute:
+            selected[:] = False
+        selected &= np.isin(values["Y"], years)
+
+        # lines the fixed layout rejects are parsed by strptime, so both accept the same timestamps
+        retry = np.flatnonzero(~ok)
+        if len(retry):
+            selected[retry], dates[retry] = self._select_parsed(buf, line_starts[retry], line_ends[retry], time_index,
+                                                                time_format, years, hour, minute)
+        return selected, dates
+
+    def _select_parsed(self, buf: np.ndarray, line_starts: np.ndarray, line_ends: np.ndarray, time_index: int,
+                       time_format: str, years: np.ndarray, hour: int, minute: int) -> tuple[np.ndarray, np.ndarray]:
+        accepted = set(years.tolist())
+        ok = np.zeros(len(line_starts), dtype=bool)
+        dates = np.full(len(line_starts), np.datetime64("NaT"), dtype="datetime64[D]")
+        for i, (s, e) in enumerate(zip(line_starts.tolist(), line_ends.tolist())):
+            try:
+                time = datetime.datetime.strptime(bytes(buf[s:e]).decode().rstrip("\r").split(self.sep)[time_index], time_format)
+            except (ValueError, IndexError):
+                continue
+            ok[i] = time.hour == hour and time.minute == minute and time.year in accepted
+            dates[i] = time.date()
+        return ok, dates
+
+
+_opened: dict[tuple[str, str], tuple[tuple[int, int], RawFile]] = {}
+
+
+def open_raw(path: str, sep: str = ",") -> RawFile:
+    """shared mapping of a raw file, every compile step reading the same file gets the same view"""
+    stamp = memo.stamp(path)
+    key = (path, sep)
+    if key in _opened:
+        if _opened[key][0] == stamp:
+            return _opened[key][1]
+        _opened[key][1].close()
+
+    raw = RawFile(path, sep)
+    _opened[key] = (stamp, raw)
+    return raw
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           conftest.py
+coded by:           Flyingfoxi
+"""
+
+import pytest
+
+
+@pytest.fixture
+def station_values() -> list[str]:
+    """measure_date values of a station export: valid ones in every offset form strptime takes and broken ones"""
+    return ["2010-01-05 12:00:00+00:00", "2010-01-05 12:00:00+0100", "2010-01-05 12:00:00-01:30",
+            "2010-01-05 12:00:00Z", "2010-01-05 12:00:00+00:30:00", "2010-13-05 12:00:00+00:00",
+            "2010-01-32 12:00:00+00:00", "2010-02-30 12:00:00+00:00", "2010-01-05 24:00:00+00:00",
+            "2010-01-05 12:60:00+00:00", "2010-01-05 12:00:60+00:00", "2010-01-05 12:00:00",
+            "2010-01-05 12:00:00+00:00x", "2010-01-05 12:00:00 +00:00", "2010-01-05 12:00:00+0a:00",
+            "2010-01-05 12:00:00+25:00", "2010/01/05 12:00:00+00:00", "2010-1-05 12:00:00+00:00"]
+
+
+@pytest.fixture
+def rainfall_values() -> list[str]:
+    """time values of niederschlag.csv, valid and broken ones"""
+    return ["2010010112", "2010130112", "2010013212", "2010010124", "201001011", "20100101120"]
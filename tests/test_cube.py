@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           test_cube.py
+coded by:           Flyingfoxi
+"""
+
+import numpy as np
+
+import cube
+
+
+def _cube() -> cube.StationCube:
+    stations = ["JUL2", "URS2", "VAL2"]
+    days = np.arange("2020-01-01", "2020-01-11", dtype="datetime64[D]")
+    fields = ["HS", "TA_30MIN_MEAN", "DW_30MIN_MEAN", "rre024i0"]
+    values = np.arange(len(stations) * len(days) * len(fields), dtype=float).reshape(len(stations), len(days), len(fields))
+    return cube.StationCube(stations, days, fields, values)
+
+
+def test_select_single_station_non_adjacent_fields():
+    station_cube = _cube()
+    selected = station_cube.select("JUL2", fields=["HS", "rre024i0"])
+    assert selected.shape == (10, 2)
+    np.testing.assert_array_equal(selected, station_cube.values[0][:, [0, 3]])
+
+
+def test_select_station_list_and_field_list():
+    station_cube = _cube()
+    selected = station_cube.select(["JUL2", "VAL2"], "2020-01-03", "2020-01-05", ["HS", "rre024i0"])
+    assert selected.shape == (2, 3, 2)
+    np.testing.assert_array_equal(selected, station_cube.values[[0, 2]][:, 2:5][..., [0, 3]])
+
+
+def test_select_station_list_and_single_field():
+    station_cube = _cube()
+    selected = station_cube.select(["VAL2", "JUL2"], fields="TA_30MIN_MEAN")
+    assert selected.shape == (2, 10)
+    np.testing.assert_array_equal(selected, station_cube.values[[2, 0], :, 1])
+
+
+def test_select_adjacent_names_is_a_view():
+    station_cube = _cube()
+    assert np.shares_memory(station_cube.select(["JUL2", "URS2"], fields=["HS", "TA_30MIN_MEAN"]), station_cube.values)
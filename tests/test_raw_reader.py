@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           test_raw_reader.py
+coded by:           Flyingfoxi
+"""
+
+import raw_reader
+import timestamps
+
+
+def test_fixed_layout_selects_what_strptime_selects(tmp_path, monkeypatch, station_values):
+    path = tmp_path / "JUL2.csv"
+    lines = ["station_code,measure_date,HS"] + [f"JUL2,{value},{i}" for i, value in enumerate(station_values)]
+    path.write_text("\n".join(lines) + "\r\n")
+
+    def selected() -> list[tuple[str, str]]:
+        raw_reader._opened.clear()
+        raw = raw_reader.open_raw(str(path))
+        blocks = raw.select(["HS"], "measure_date", timestamps.STATION_FORMAT, [2010], with_dates=True)
+        return [(row[0], str(date)) for rows, dates in blocks for row, date in zip(rows, dates)]
+
+    fixed = selected()
+    monkeypatch.setattr(timestamps, "fixed_layout", lambda time_format: None)
+    assert fixed == selected()
+    assert [value for value, _ in fixed] == ["0", "1", "2", "3", "4", "17"]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           test_timestamps.py
+coded by:           Flyingfoxi
+"""
+
+import datetime
+
+import numpy as np
+
+import timestamps
+
+
+def _strptime(value: str, time_format: str) -> np.datetime64:
+    try:
+        time = datetime.datetime.strptime(value, time_format)
+    except ValueError:
+        return np.datetime64("NaT", "s")
+    if time.utcoffset() is not None:
+        time = time - time.utcoffset()
+    return np.datetime64(time.replace(tzinfo=None), "s")
+
+
+def test_parse_station_values_like_strptime(station_values):
+    expected = np.array([_strptime(value, timestamps.STATION_FORMAT) for value in station_values])
+    np.testing.assert_array_equal(timestamps.parse(station_values, timestamps.STATION_FORMAT), expected)
+
+
+def test_parse_rainfall_values_like_strptime(rainfall_values):
+    expected = np.array([_strptime(value, timestamps.RAINFALL_FORMAT) for value in rainfall_values])
+    np.testing.assert_array_equal(timestamps.parse(rainfall_values, timestamps.RAINFALL_FORMAT), expected)
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           timestamps.py
+coded by:           Flyingfoxi
+"""
+
+import datetime
+
+import numpy as np
+
+import calendar_index
+
+__all__ = ["STATION_FORMAT", "RAINFALL_FORMAT", "fixed_layout", "read_fields", "from_fields", "utc_offsets", "parse", "days", "shift",
+           "format_utc"]
+
+STATION_FORMAT = "%Y-%m-%d %H:%M:%S%z"     # 2008-01-01 12:00:00+00:00 in the station exports and compiled files
+RAINFALL_FORMAT = "%Y%m%d%H"               # 2008010112 in niederschlag.csv
+
+_WIDTHS = {"Y": 4, "m": 2, "d": 2, "H": 2, "M": 2, "S": 2}
+
+
+def fixed_layout(time_format: str) -> tuple[dict[str, slice], int, dict[int, int]] | None:
+    """
+    character positions of the fields of a fixed width time format like %Y-%m-%d %H:%M:%S%z, its width (without %z)
+    and the byte of every literal character by position
+    returns None if the format has directives without a fixed width (only a trailing %z is allowed)
+    """
+    layout = {}
+    literals = {}
+    position = 0
+    i = 0
+    while i < len(time_format):
+        if time_format[i] != "%":
+            literals[position] = ord(time_format[i])
+            position += 1
+            i += 1
+            continue
+        directive = time_format[i + 1:i + 2]
+        if directive == "z" and i + 2 == len(time_format):
+            break
+        if directive not in _WIDTHS:
+            return None
+        layout[directive] = slice(position, position + _WIDTHS[directive])
+        position += _WIDTHS[directive]
+        i += 2
+    return layout, position, literals
+
+
+def _number(buf: np.ndarray, positions: np.ndarray, width: int, ok: np.ndarray) -> np.ndarray:
+    """integer of the width digits at every position, ok is cleared where one of them is not a digit"""
+    limit = len(buf) - 1
+    value = np.zeros(len(positions), dtype=np.int64)
+    for k in range(width):
+        digit = buf[np.minimum(positions + k, limit)].astype(np.int64) - 48
+        ok &= (digit >= 0) & (digit <= 9)
+        value = value * 10 + digit
+    return value
+
+
+def read_fields(buf: np.ndarray, starts: np.ndarray, layout: tuple[dict[str, slice], int, dict[int, int]],
+                ok: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    integer columns of the fields of the timestamps beginning at starts in the byte buffer buf
+    ok is cleared for timestamps with a non digit in a field, another character than the format between the fields,
+    a time like 24:00 or 12:60 or an impossible date like the 13th month or the 30th of february
+    """
+    fields, _, literals = layout
+    values = {directive: _number(buf, starts + field.start, field.stop - field.start, ok) for directive, field in fields.items()}
+    limit = len(buf) - 1
+    for position, byte in literals.items():
+        ok &= buf[np.minimum(starts + position, limit)] == byte
+    for directive, highest in (("H", 23), ("M", 59), ("S", 59)):
+        if directive in values:
+            ok &= values[directive] <= highest
+
+    if {"Y", "m", "d"} <= values.keys():
+        months = np.where(ok, values["m"], 1)
+        dates = calendar_index.from_keys(np.where(ok, values["Y"], 1970), months, np.where(ok, values["d"], 1))
+        ok &= (months >= 1) & (months <= 12) & (values["d"] >= 1)
+        ok &= dates.astype("datetime64[M]").astype(np.int64) % 12 + 1 == months
+    return values
+
+
+def from_fields(values: dict[str, np.ndarray], ok: np.ndarray | None = None) -> np.ndarray:
+    """datetime64[s] of the integer columns of read_fields, NaT where ok is False"""
+    n = len(next(iter(values.values())))
+    ok = np.ones(n, dtype=bool) if ok is None else ok
+
+    def get(directive: str, default: int) -> np.ndarray:
+        return np.where(ok, values[directive], default) if directive in values else np.full(n, default)
+
+    dates = calendar_index.from_keys(get("Y", 1970), get("m", 1), get("d", 1)).astype("datetime64[s]")
+    seconds = get("H", 0) * 3600 + get("M", 0) * 60 + get("S", 0)
+    times = dates + seconds.astype("timedelta64[s]")
+    times[~ok] = np.datetime64("NaT")
+    return times
+
+
+def utc_offsets(buf: np.ndarray, positions: np.ndarray, lengths: np.ndarray, time_format: str,
+                ok: np.ndarray) -> np.ndarray:
+    """
+    seconds of the +HH:MM / +HHMM offset of a time_format ending with %z, starting at positions and lengths long
+    (0 for other formats), ok is cleared where the rest of a timestamp is anything else (or not empty without %z)
+    """
+    if not time_format.endswith("%z"):
+        ok &= lengths == 0
+        return np.zeros(len(positions), dtype=np.int64)
+
+    limit = len(buf) - 1
+    sign = buf[np.minimum(positions, limit)]
+    colon = (lengths == 6) & (buf[np.minimum(positions + 3, limit)] == ord(":"))
+    ok &= ((sign == ord("+")) | (sign == ord("-"))) & ((lengths == 5) | colon)
+
+    hours = _number(buf, positions + 1, 2, ok)
+    minutes = _number(buf, positions + 3 + colon, 2, ok)
+    ok &= (hours <= 23) & (minutes <= 59)
+    offsets = np.where(ok, hours * 3600 + minutes * 60, 0)
+    return np.where(sign == ord("-"), -offsets, offsets)
+
+
+def _strptime(value, time_format: str, utc: bool) -> np.datetime64:
+    """datetime64[s] of one timestamp parsed by datetime.strptime, NaT if it does not match time_format"""
+    try:
+        time = datetime.datetime.strptime(str(value), time_format)
+    except ValueError:
+        return np.datetime64("NaT", "s")
+    if utc and time.utcoffset() is not None:
+        time = time - time.utcoffset()
+    return np.datetime64(time.replace(tzinfo=None), "s")
+
+
+def _buffer(strings) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """the strings as fixed width bytes: flat buffer, start of every string and its length"""
+    array = np.asarray(strings)
+    if array.dtype.kind != "S":
+        try:
+            array = array.astype("S")
+        except UnicodeEncodeError:
+            array = np.array([str(s).encode("ascii", "replace") for s in array.tolist()], dtype="S")
+    width = max(array.dtype.itemsize, 1)
+    array = array.astype(f"S{width}")
+    buf = np.frombuffer(array.tobytes(), dtype=np.uint8)
+    return buf, np.arange(len(array), dtype=np.int64) * width, np.char.str_len(array).astype(np.int64)
+
+
+def parse(strings, time_format: str = STATION_FORMAT, utc: bool = True) -> np.ndarray:
+    """
+    datetime64[s] of a whole column of timestamps in a fixed width time_format, NaT where a value does not match
+    a trailing %z offset like +00:00 is subtracted when utc is set, otherwise the time is returned as written
+    values the vectorized parser rejects are parsed by datetime.strptime, so both accept the same values
+    """
+    layout = fixed_layout(time_format)
+    if layout is None:
+        raise ValueError(f"'{time_format}' is not a fixed width time format")
+    if not len(strings):
+        return np.array([], dtype="datetime64[s]")
+
+    buf, starts, lengths = _buffer(strings)
+    ok = lengths >= layout[1]
+    values = read_fields(buf, starts, layout, ok)
+    offsets = utc_offsets(buf, starts + layout[1], lengths - layout[1], time_format, ok)
+    times = from_fields(values, ok)
+    if utc:
+        times = times - offsets.astype("timedelta64[s]")
+
+    # anything the fixed layout does not cover (a Z or +HH:MM:SS offset, ...) is left to strptime
+    for i in np.flatnonzero(~ok).tolist():
+        times[i] = _strptime(strings[i], time_format, utc)
+    return times
+
+
+def days(strings, time_format: str = STATION_FORMAT) -> np.ndarray:
+    """
+    datetime64[D] of the day a timestamp was written on (the offset is not applied, like split(" ")[0])
+    values not matching time_format but holding an iso date or year like the trend files do are parsed by numpy
+    """
+    dates = parse(strings, time_format, utc=False).astype("datetime64[D]")
+    for i in np.flatnonzero(np.isnat(dates)).tolist():
+        value = str(strings[i]).split(" ")[0]
+        if value:
+            dates[i] = np.datetime64(value, "D")
+    return dates
+
+
+def shift(times: np.ndarray, hours: int) -> np.ndarray:
+    """times moved by hours, like the rainfall sum measured at 12:00 that belongs to the day starting 12h before"""
+    return times + np.timedelta64(hours, "h")
+
+
+def format_utc(times: np.ndarray) -> list[str]:
+    """%Y-%m-%d %H:%M:%S+0000 strings of utc datetime64 values"""
+    return [s.replace("T", " ") + "+0000" for s in np.datetime_as_string(times.astype("datetime64[s]"), unit="s").tolist()]
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+date of creation:   17.10.2026
+filename:           trends.py
+coded by:           Flyingfoxi
+"""
+
+import argparse
+
+import numpy as np
+
+import aggregation
+import calendar_index
+import cube
+
+__all__ = ["FIELDS", "SEASONS", "decimal_years", "group_values", "fit", "rolling_slopes", "anomalies", "station_series",
+           "Trends", "analyse"]
+
+FIELDS = ("HS", "TA_30MIN_MEAN", "DW_30MIN_MEAN", "rre024i0")
+SEASONS = ("winter", "spring", "summer", "autumn")  # see aggregation.seasons
+
+# every function works on a matrix with one row per series (a station / field pair) and one column per time step,
+# missing values are NaN and are left out of every sum, mean and fit
+
+
+def decimal_years(keys: list[np.ndarray], by: str) -> np.ndarray:
+    """x position (in years) of the groups of aggregation.group_keys, so every slope is a change per year"""
+    match by:
+        case "year":
+            return keys[0].astype(float)
+        case "season":
+            return keys[0] + keys[1] / 4
+        case "month":
+            return keys[0] + (keys[1] - 1) / 12
+        case "week" | "isoweek":
+            return keys[0] + (keys[1] - 1) / 52
+        case "day":
+            dates = calendar_index.from_keys(*keys)
+            year_starts = dates.astype("datetime64[Y]")
+            year_length = ((year_starts + 1).astype("datetime64[D]") - year_starts.astype("datetime64[D]")).astype(float)
+            return keys[0] + (dates - year_starts.astype("datetime64[D]")).astype(float) / year_length
+        case other:
+            raise ValueError(f"'{other}' has no position in years, use one of year, season, month, week, isoweek, day")
+
+
+def group_values(values: np.ndarray, keys: list[np.ndarray], how: str = "mean") -> tuple[list[np.ndarray], np.ndarray]:
+    """
+    reduces the columns of values sharing the same keys (one key array per grouping level, one entry per column)
+    with mean, sum or count, returns the sorted key columns and a rows x groups matrix, NaN for groups without values
+    """
+    groups, inverse = np.unique(np.stack(keys), axis=1, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    order = np.argsort(inverse, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(inverse[order]) != 0])
+
+    valid = ~np.isnan(values[:, order])
+    counts = np.add.reduceat(valid, starts, axis=1)
+    sums = np.add.reduceat(np.where(valid, values[:, order], 0.0), starts, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        match how:
+            case "mean":
+                result = sums / counts
+            case "sum":
+                result = np.where(counts > 0, sums, np.nan)
+            case "count":
+                result = counts.astype(float)
+            case other:
+                raise ValueError(f"'{other}' is not a valid reducer, use one of mean, sum, count")
+    return list(groups), result
+
+
+def fit(x: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    least squares line through every row of values over x (shared by all rows or one row each)
+    returns slope, intercept, r² and the number of values of every row, NaN for rows with fewer than 2 values
+    """
+    values = np.atleast_2d(values)
+    x = np.broadcast_to(x, values.shape).astype(float)
+    valid = ~np.isnan(values) & ~np.isnan(x)
+    count = valid.sum(1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = np.where(valid, x, 0).sum(1) / count
+        y_mean = np.where(valid, values, 0).sum(1) / count
+        dx = np.where(valid, x - x_mean[:, None], 0)   # centered, so large x (years, day positions) lose no precision
+        dy = np.where(valid, values - y_mean[:, None], 0)
+        sxx, sxy, syy = (dx * dx).sum(1), (dx * dy).sum(1), (dy * dy).sum(1)
+
+        slope = np.where(count >= 2, sxy / sxx, np.nan)
+        intercept = y_mean - slope * x_mean
+        r2 = np.where(syy > 0, sxy * sxy / (sxx * syy), np.nan)
+    return slope, intercept, r2, count
+
+
+def rolling_slopes(x: np.ndarray, values: np.ndarray, window: int, min_count: int | None = None) -> np.ndarray:
+    """
+    slope of the line through the last window columns at every column of values (rows x columns), computed from
+    running sums in one pass, NaN until the window is full or where it holds fewer than min_count (default window // 2) values
+    """
+    if window < 2:
+        raise ValueError(f"the window of the rolling slopes must hold at least 2 groups, not {window}")
+    values = np.atleast_2d(values)
+    min_count = max(2, window // 2 if min_count is None else min_count)
+    x = np.broadcast_to(np.asarray(x, dtype=float) - np.nanmean(x), values.shape)  # centered, see fit
+
+    sums = np.cumsum(np.stack(_running(x, values)), axis=-1)
+    sums = np.concatenate((np.zeros(sums.shape[:-1] + (1,)), sums), axis=-1)
+    n, sx, sy, sxx, sxy = sums[..., window:] - sums[..., :-window]
+
+    slopes = np.full(values.shape, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slopes[:, window - 1:] = np.where(n >= min_count, (n * sxy - sx * sy) / (n * sxx - sx * sx), np.nan)
+    return slopes
+
+
+def _running(x: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, ...]:
+    """the terms of the windowed sums of rolling_slopes"""
+    valid = ~np.isnan(values) & ~np.isnan(x)
+    y = np.where(valid, values, 0.0)
+    x = np.where(valid, x, 0.0)
+    return valid.astype(float), x, y, x * x, x * y
+
+
+def anomalies(values: np.ndarray, periods: np.ndarray | None = None) -> np.ndarray:
+    """
+    difference of every value to the long-term mean of its row, or to the long-term mean of its period
+    (e.g. the month of a monthly series) when periods (one entry per column) is given
+    """
+    values = np.atleast_2d(values)
+    if periods is None:
+        return values - group_values(values, [np.zeros(values.shape[1], dtype=int)])[1]
+    groups, means = group_values(values, [periods])
+    return values - means[:, np.searchsorted(groups[0], periods)]
+
+
+def station_series(files: list[str], fields: tuple[str, ...] = FIELDS) -> tuple[list[tuple[str, str]], np.ndarray, np.ndarray]:
+    """
+    every field of every compiled station file as one row of a matrix over the days of all files (NaN where
+    a station has no value or no such field), returns the (station, field) of every row, the days and the matrix
+    """
+    station_cube = cube.StationCube.build(files, list(fields))
+    labels = [(station, field) for station in station_cube.stations for field in fields]
+    matrix = station_cube.values.transpose(0, 2, 1).reshape(len(labels), len(station_cube.days))
+    return labels, station_cube.days, matrix
+
+
+class Trends:
+    """the results of analyse, one row per series, see summary and table for the exported layouts"""
+
+    def __init__(self, labels: list[tuple[str, str]], by: str, keys: list[np.ndarray], x: np.ndarray,
+                 values: np.ndarray, slope: np.ndarray, intercept: np.ndarray, r2: np.ndarray, count: np.ndarray,
+                 rolling: np.ndarray, anomaly: np.ndarray, seasons: np.ndarray):
+        self.labels = labels
+        self.by = by
+        self.keys = keys
+        self.x = x
+        self.values = values
+        self.slope = slope
+        self.intercept = intercept
+        self.r2 = r2
+        self.count = count
+        self.rolling = rolling
+        self.anomaly = anomaly
+        self.seasons = seasons
+
+    def __getitem__(self, label: tuple[str, str]) -> dict:
+        """the results of the series of one (station, field)"""
+        i = self.labels.index(label)
+        return {"x": self.x, "values": self.values[i], "slope": self.slope[i], "intercept": self.intercept[i],
+                "r2": self.r2[i], "count": self.count[i], "rolling": self.rolling[i], "anomaly": self.anomaly[i],
+                "seasons": dict(zip(SEASONS, self.seasons[i].tolist()))}
+
+    def summary(self) -> list[list[str]]:
+        """one row per series with values: fit, long-term mean, last rolling slope and anomaly, seasonal means"""
+        def last(matrix: np.ndarray) -> np.ndarray:
+            """last value of every row that is not NaN"""
+            filled = ~np.isnan(matrix)
+            index = matrix.shape[1] - 1 - np.argmax(filled[:, ::-1], axis=1)
+            return np.where(filled.any(1), matrix[np.arange(len(matrix)), index], np.nan)
+
+        means = group_values(self.values, [np.zeros(len(self.x), dtype=int)])[1][:, 0]
+        columns = [self.slope, self.intercept, self.r2, means, last(self.rolling), last(self.anomaly), *self.seasons.T]
+        compiled = [["station_code", "field", "typ", "count", "slope", "intercept", "r2", "mean", "rolling_slope",
+                     "anomaly", *SEASONS]]
+        for i, (station, field) in enumerate(self.labels):
+            if self.count[i]:
+                compiled.append([station, field, self.by, str(int(self.count[i]))] + [str(float(c[i])) for c in columns])
+        return compiled
+
+    def table(self) -> list[list[str]]:
+        """one row per series and group with a value: position in years, value, rolling slope and anomaly"""
+        periods = ["-".join(map(str, key)) for key in zip(*(k.tolist() for k in self.keys))]
+        compiled = [["station_code", "field", self.by, "x", "value", "rolling_slope", "anomaly"]]
+        rows, columns = np.nonzero(~np.isnan(self.values))
+        for i, j in zip(rows.tolist(), columns.tolist()):
+            compiled.append([*self.labels[i], periods[j], str(float(self.x[j])), str(float(self.values[i, j])),
+                             str(float(self.rolling[i, j])), str(float(self.anomaly[i, j]))])
+        return compiled
+
+
+def analyse(labels: list[tuple[str, str]], days: np.ndarray, matrix: np.ndarray, by: str = "year", how: str = "mean",
+            window: int = 10) -> Trends:
+    """
+    trends of every row of a daily matrix (see station_series) in one batch: the rows are reduced to groups of by,
+    a line is fitted through every row, rolling slopes over window groups and anomalies to the long-term mean of the
+    group's period (month, season, ...) or of the row are computed, and the mean of every season over all years
+    """
+    keys, values = group_values(matrix, aggregation.group_keys(days, by), how)
+    x = decimal_years(keys, by)
+    slope, intercept, r2, count = fit(x, values)
+
+    (present,), means = group_values(matrix, [aggregation.seasons(days)[1]], how)
+    seasons = np.full((len(matrix), len(SEASONS)), np.nan)
+    seasons[:, present] = means
+
+    periods = keys[1] if by in ("season", "month", "week", "isoweek") else None
+    return Trends(labels, by, keys, x, values, slope, intercept, r2, count, rolling_slopes(x, values, window),
+                  anomalies(values, periods), seasons)
+
+
+if __name__ == '__main__':
+    from compile_csv import write_file  # compile_csv imports this module, so not at the top
+
+    parser = argparse.ArgumentParser(description="trends of every station and field of data/")
+    parser.add_argument("-d", "--data", default="data/", help="directory of the compiled station files")
+    parser.add_argument("-f", "--fields", nargs="+", default=list(FIELDS), help="fields to analyse")
+    parser.add_argument("-b", "--by", default="year", help="grouping the fits run over (year, season, month, week, day)")
+    parser.add_argument("--how", default="mean", help="reducer of the groups (mean, sum)")
+    parser.add_argument("-w", "--window", type=int, default=10, help="groups of the rolling slopes")
+    parser.add_argument("-o", "--output", default="trends.csv", help="summary table, one row per station and field")
+    parser.add_argument("-t", "--table", default=None, help="also writes the value, rolling slope and anomaly of every group")
+    args = parser.parse_args()
+    if args.window < 2:
+        parser.error(f"the window of the rolling slopes must hold at least 2 groups, not {args.window}")
+
+    trends = analyse(*station_series(cube.station_files(args.data), tuple(args.fields)), by=args.by, how=args.how, window=args.window)
+    write_file(trends.summary(), args.output)
+    if args.table:
+        write_file(trends.table(), args.table)
+    print(f"trends of {len(trends.labels)} series written to {args.output}")